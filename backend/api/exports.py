@@ -0,0 +1,139 @@
+import csv
+import os
+import tempfile
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from inspect import isabstract
+from wsgiref.util import FileWrapper
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+SHOPPING_LIST_TITLE = "Список покупок"
+PDF_FONT_NAME = "Slimamif"
+PDF_FONT_PATH = os.path.join(settings.BASE_DIR, "Slimamif.ttf")
+SPOOL_MAX_SIZE = 1024 * 1024
+
+
+@lru_cache(maxsize=None)
+def register_pdf_font():
+    """Register the Cyrillic PDF font once per process."""
+    pdfmetrics.registerFont(TTFont(PDF_FONT_NAME, PDF_FONT_PATH))
+    return PDF_FONT_NAME
+
+
+class Echo:
+    """File-like object that returns what is written to it."""
+
+    def write(self, value):
+        return value
+
+
+class ShoppingListExporter(ABC):
+    """
+    Base class of shopping list exporters.
+
+    Subclasses turn ``(name, measurement_unit, amount)`` rows
+    into an iterable of response chunks.
+    """
+
+    content_type = None
+    extension = None
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    @abstractmethod
+    def render(self):
+        """Return an iterable of the response chunks."""
+
+    def get_response(self):
+        response = StreamingHttpResponse(
+            self.render(), content_type=self.content_type
+        )
+        response[
+            "Content-Disposition"
+        ] = f'attachment; filename="ingredients.{self.extension}"'
+        return response
+
+
+class TextExporter(ShoppingListExporter):
+    content_type = "text/plain; charset=utf-8"
+    extension = "txt"
+
+    def render(self):
+        yield SHOPPING_LIST_TITLE
+        for name, units, amount in self.rows:
+            yield f"\n{name}: {amount} {units}"
+
+
+class CsvExporter(ShoppingListExporter):
+    content_type = "text/csv; charset=utf-8"
+    extension = "csv"
+
+    def render(self):
+        writer = csv.writer(Echo())
+        yield writer.writerow(("name", "measurement_unit", "amount"))
+        for row in self.rows:
+            yield writer.writerow(row)
+
+
+class PdfExporter(ShoppingListExporter):
+    """
+    Render the shopping list into a spooled temporary file.
+
+    A PDF can only be written out as a whole, so pages are drawn
+    into a file that stays in memory while small and moves to disk
+    for large lists. The file is then streamed in chunks.
+    """
+
+    content_type = "application/pdf"
+    extension = "pdf"
+    font_size = 12
+    title_font_size = 16
+    margin = 50
+    line_height = 18
+
+    def render(self):
+        font_name = register_pdf_font()
+        buffer = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+        width, height = A4
+        pdf = canvas.Canvas(buffer, pagesize=A4)
+        pdf.setFont(font_name, self.title_font_size)
+        pdf.drawString(self.margin, height - self.margin, SHOPPING_LIST_TITLE)
+        pdf.setFont(font_name, self.font_size)
+        y = height - self.margin - 2 * self.line_height
+        for name, units, amount in self.rows:
+            if y < self.margin:
+                pdf.showPage()
+                pdf.setFont(font_name, self.font_size)
+                y = height - self.margin
+            pdf.drawString(self.margin, y, f"{name}: {amount} {units}")
+            y -= self.line_height
+        pdf.save()
+        buffer.seek(0)
+        return FileWrapper(buffer)
+
+
+def build_registry(*exporters):
+    """
+    Map file extensions to the exporters.
+
+    An incomplete exporter fails here, on import, instead of in the
+    first request asking for its format.
+    """
+    for exporter in exporters:
+        if isabstract(exporter):
+            raise TypeError(f"{exporter.__name__} does not implement render()")
+        if exporter.content_type is None or exporter.extension is None:
+            raise TypeError(
+                f"{exporter.__name__} needs a content type and an extension"
+            )
+    return {exporter.extension: exporter for exporter in exporters}
+
+
+EXPORTERS = build_registry(TextExporter, CsvExporter, PdfExporter)
@@ -0,0 +1,166 @@
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+from time import perf_counter
+
+from foodgram.db.metrics import get_connection_metrics
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+request_stats = ContextVar("request_stats", default=None)
+
+
+class RequestStats:
+    """Time and queries spent on the current request."""
+
+    def __init__(self):
+        self.start = perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.serialization_time = 0.0
+        self.serializing = False
+
+    @property
+    def total_time(self):
+        return perf_counter() - self.start
+
+
+def record_query(execute, sql, params, many, context):
+    """Database execute wrapper adding the query to the request stats."""
+    stats = request_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.db_time += perf_counter() - start
+
+
+@contextmanager
+def timed_serialization():
+    """
+    Add the time of the block to the serialization time of the request.
+
+    Queries run meanwhile, such as a lazily evaluated queryset, stay in
+    the database time. Nested blocks are counted once, by the outer one.
+    """
+    stats = request_stats.get()
+    if stats is None or stats.serializing:
+        yield
+        return
+    stats.serializing = True
+    start = perf_counter()
+    db_time = stats.db_time
+    try:
+        yield
+    finally:
+        stats.serializing = False
+        stats.serialization_time += (
+            perf_counter() - start - (stats.db_time - db_time)
+        )
+
+
+class Histogram:
+    """Cumulative histogram of observations per label values."""
+
+    def __init__(self, name, description, buckets):
+        self.name = name
+        self.description = description
+        self.buckets = buckets
+        self.series = {}
+        self.lock = Lock()
+
+    def observe(self, labels, value):
+        with self.lock:
+            counts, total = self.series.get(
+                labels, ([0] * (len(self.buckets) + 1), 0)
+            )
+            counts[bisect_left(self.buckets, value)] += 1
+            self.series[labels] = (counts, total + value)
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} histogram",
+        ]
+        with self.lock:
+            series = {
+                labels: (list(counts), total)
+                for labels, (counts, total) in self.series.items()
+            }
+        for labels, (counts, total) in sorted(series.items()):
+            label_text = ",".join(
+                f'{name}="{value}"' for name, value in labels
+            )
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                lines.append(
+                    f'{self.name}_bucket{{{label_text},le="{bound}"}} '
+                    f"{cumulative}"
+                )
+            lines.append(f"{self.name}_sum{{{label_text}}} {total}")
+            lines.append(f"{self.name}_count{{{label_text}}} {cumulative}")
+        return lines
+
+
+REQUEST_DURATION = Histogram(
+    "foodgram_request_duration_seconds",
+    "Total time spent on requests.",
+    LATENCY_BUCKETS,
+)
+DB_DURATION = Histogram(
+    "foodgram_request_db_duration_seconds",
+    "Time spent on database queries per request.",
+    LATENCY_BUCKETS,
+)
+SERIALIZATION_DURATION = Histogram(
+    "foodgram_request_serialization_duration_seconds",
+    "Time spent serializing and rendering responses per request.",
+    LATENCY_BUCKETS,
+)
+QUERY_COUNT = Histogram(
+    "foodgram_request_queries",
+    "Database queries per request.",
+    QUERY_BUCKETS,
+)
+
+
+def observe_request(labels, stats, total_time):
+    REQUEST_DURATION.observe(labels, total_time)
+    DB_DURATION.observe(labels, stats.db_time)
+    SERIALIZATION_DURATION.observe(labels, stats.serialization_time)
+    QUERY_COUNT.observe(labels, stats.queries)
+
+
+def render_metrics():
+    """Return the metrics of the process in Prometheus text format."""
+    lines = []
+    for histogram in (
+        REQUEST_DURATION,
+        DB_DURATION,
+        SERIALIZATION_DURATION,
+        QUERY_COUNT,
+    ):
+        lines += histogram.render()
+    connections = get_connection_metrics()
+    for name, value in connections.items():
+        if name == "pools":
+            continue
+        metric = f"foodgram_db_connections_{name}"
+        lines.append(f"# TYPE {metric} gauge")
+        lines.append(f"{metric} {value}")
+    pool_gauges = {}
+    for alias, usage in connections["pools"].items():
+        for name, value in usage.items():
+            pool_gauges.setdefault(name, []).append((alias, value))
+    for name, series in pool_gauges.items():
+        metric = f"foodgram_db_pool_{name}"
+        lines.append(f"# TYPE {metric} gauge")
+        for alias, value in series:
+            lines.append(f'{metric}{{alias="{alias}"}} {value}')
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,75 @@
+import asyncio
+import logging
+
+from django.conf import settings
+from django.utils.decorators import sync_and_async_middleware
+
+from api.metrics import RequestStats, observe_request, request_stats
+
+logger = logging.getLogger(__name__)
+
+
+@sync_and_async_middleware
+def instrumentation_middleware(get_response):
+    """
+    Measure queries, database time, rendering time and latency.
+
+    The measurements are sent in a ``Server-Timing`` header, added to
+    the per-view histograms and logged for requests slower than
+    ``SLOW_REQUEST_THRESHOLD_MS``. Stats live in a context variable,
+    so queries of views run in worker threads are counted as well.
+    """
+    if asyncio.iscoroutinefunction(get_response):
+
+        async def middleware(request):
+            stats = RequestStats()
+            token = request_stats.set(stats)
+            try:
+                response = await get_response(request)
+            finally:
+                request_stats.reset(token)
+            return finish(request, response, stats)
+
+    else:
+
+        def middleware(request):
+            stats = RequestStats()
+            token = request_stats.set(stats)
+            try:
+                response = get_response(request)
+            finally:
+                request_stats.reset(token)
+            return finish(request, response, stats)
+
+    return middleware
+
+
+def finish(request, response, stats):
+    total_time = stats.total_time
+    match = request.resolver_match
+    view = match.view_name if match else "unmatched"
+    observe_request(
+        (
+            ("view", view),
+            ("method", request.method),
+            ("status", str(response.status_code)),
+        ),
+        stats,
+        total_time,
+    )
+    response["Server-Timing"] = (
+        f'db;dur={stats.db_time * 1000:.1f};desc="{stats.queries} queries", '
+        f"serialize;dur={stats.serialization_time * 1000:.1f}, "
+        f"total;dur={total_time * 1000:.1f}"
+    )
+    if total_time * 1000 > settings.SLOW_REQUEST_THRESHOLD_MS:
+        logger.warning(
+            "Slow request %s %s (%s): %.0f ms, %d queries in %.0f ms",
+            request.method,
+            request.get_full_path(),
+            view,
+            total_time * 1000,
+            stats.queries,
+            stats.db_time * 1000,
+        )
+    return response
@@ -0,0 +1,11 @@
+from rest_framework.renderers import JSONRenderer
+
+from api.metrics import timed_serialization
+
+
+class TimedJSONRenderer(JSONRenderer):
+    """JSON renderer adding its time to the request stats."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with timed_serialization():
+            return super().render(data, accepted_media_type, renderer_context)
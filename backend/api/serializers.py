@@ -1,11 +1,14 @@
 from django.contrib.auth import get_user_model
 from django.db import transaction
-from django.shortcuts import get_object_or_404
 from djoser.serializers import UserCreateSerializer
 from rest_framework import serializers
 
-from api.fields import Base64ImageField
-from api.services import add_ingredients_to_recipe
+from api.fields import Base64ImageField, PrimaryKeyListField
+from api.metrics import timed_serialization
+from api.services import (add_ingredients_to_recipe, change_counter,
+                          get_recipe_queryset, invalidate_shopping_list,
+                          update_recipe_ingredients)
+from recipes.images import rendition_urls, schedule_renditions
 from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
                             ShoppingCart, Tag)
 from users.models import Subscription
@@ -13,7 +16,23 @@ from users.models import Subscription
 User = get_user_model()
 
 
-class UserSerializer(UserCreateSerializer):
+class TimedDataMixin:
+    """
+    Serializer mixin adding the time of building ``data`` to the request
+    stats, for the serializers the views return.
+    """
+
+    @property
+    def data(self):
+        with timed_serialization():
+            return super().data
+
+
+class TimedListSerializer(TimedDataMixin, serializers.ListSerializer):
+    pass
+
+
+class UserSerializer(TimedDataMixin, UserCreateSerializer):
     is_subscribed = serializers.SerializerMethodField()
 
     class Meta(UserCreateSerializer.Meta):
@@ -25,13 +44,17 @@ class UserSerializer(UserCreateSerializer):
             "last_name",
             "password",
             "is_subscribed",
+            "recipes_count",
+            "followers_count",
         )
+        read_only_fields = ("recipes_count", "followers_count")
         extra_kwargs = {
             "password": {"write_only": True},
             "email": {"required": True},
             "first_name": {"required": True},
             "last_name": {"required": True},
         }
+        list_serializer_class = TimedListSerializer
 
     def run_validation(self, data=serializers.empty):
         if self.context["request"].method == "POST":
@@ -39,6 +62,8 @@ class UserSerializer(UserCreateSerializer):
         return super().run_validation(data)
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, "is_subscribed"):
+            return obj.is_subscribed
         request = self.context["request"]
         if request.user.is_anonymous:
             return False
@@ -47,14 +72,15 @@ class UserSerializer(UserCreateSerializer):
         ).exists()
 
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(TimedDataMixin, serializers.ModelSerializer):
     class Meta:
         fields = ("id", "name", "color", "slug")
         read_only_fields = ("id", "slug")
         model = Tag
+        list_serializer_class = TimedListSerializer
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(TimedDataMixin, serializers.ModelSerializer):
     class Meta:
         model = Ingredient
         fields = (
@@ -62,6 +88,7 @@ class IngredientSerializer(serializers.ModelSerializer):
             "name",
             "measurement_unit",
         )
+        list_serializer_class = TimedListSerializer
 
 
 class AuthorSerializer(serializers.ModelSerializer):
@@ -76,9 +103,13 @@ class AuthorSerializer(serializers.ModelSerializer):
             "first_name",
             "last_name",
             "is_subscribed",
+            "recipes_count",
+            "followers_count",
         )
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, "is_subscribed"):
+            return obj.is_subscribed
         request = self.context["request"]
         if request.user.is_anonymous:
             return False
@@ -88,30 +119,33 @@ class AuthorSerializer(serializers.ModelSerializer):
 
 
 class FavoriteSerializer(serializers.ModelSerializer):
-    user = serializers.HiddenField(default=serializers.CurrentUserDefault())
-    recipe = serializers.HiddenField(default=None)
-
-    def validate_recipe(self, value):
-        recipe_id = self.context["request"].parser_context["kwargs"]["pk"]
-        return get_object_or_404(Recipe, pk=recipe_id)
-
     class Meta:
         fields = ("user", "recipe")
         model = Favorite
 
+    def to_representation(self, instance):
+        return RecipeSmallSerializer(instance.recipe).data
 
-class ShoppingCartSerializer(serializers.ModelSerializer):
-    user = serializers.HiddenField(default=serializers.CurrentUserDefault())
-    recipe = serializers.HiddenField(default=None)
-
-    def validate_recipe(self, value):
-        recipe_id = self.context["request"].parser_context["kwargs"]["pk"]
-        return get_object_or_404(Recipe, pk=recipe_id)
 
+class ShoppingCartSerializer(serializers.ModelSerializer):
     class Meta:
         fields = ("user", "recipe")
         model = ShoppingCart
 
+    def to_representation(self, instance):
+        return RecipeSmallSerializer(instance.recipe).data
+
+
+class RecipeIdListSerializer(serializers.Serializer):
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=100,
+    )
+
+    def validate_recipes(self, value):
+        return list(dict.fromkeys(value))
+
 
 class RecipeIngredientsSerializer(serializers.ModelSerializer):
     id = serializers.ReadOnlyField(source="ingredient.id")
@@ -130,10 +164,25 @@ class RecipeIngredientsSerializer(serializers.ModelSerializer):
         )
 
 
+class RecipeIngredientListSerializer(serializers.ListSerializer):
+    """Resolve ingredients of all items with a single ``id__in`` query."""
+
+    def to_internal_value(self, data):
+        items = super().to_internal_value(data)
+        pks = {item["ingredient_id"] for item in items}
+        ingredients = Ingredient.objects.in_bulk(pks)
+        missing = sorted(pks - ingredients.keys())
+        if missing:
+            raise serializers.ValidationError(
+                f"Invalid pk(s) {missing} - objects do not exist."
+            )
+        for item in items:
+            item["ingredient"] = ingredients[item.pop("ingredient_id")]
+        return items
+
+
 class RecipeIngredientCreateSerializer(serializers.ModelSerializer):
-    id = serializers.PrimaryKeyRelatedField(
-        source="ingredient", queryset=Ingredient.objects.all()
-    )
+    id = serializers.IntegerField(source="ingredient_id", min_value=1)
 
     class Meta:
         model = RecipeIngredient
@@ -141,6 +190,7 @@ class RecipeIngredientCreateSerializer(serializers.ModelSerializer):
             "id",
             "amount",
         )
+        list_serializer_class = RecipeIngredientListSerializer
 
     def to_representation(self, instance):
         rep = super().to_representation(instance)
@@ -149,7 +199,29 @@ class RecipeIngredientCreateSerializer(serializers.ModelSerializer):
         return rep
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class ImageRenditionsField(serializers.Field):
+    """URLs of resized renditions of the recipe image, or of the original."""
+
+    def __init__(self, **kwargs):
+        kwargs["source"] = "*"
+        kwargs["read_only"] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        urls = rendition_urls(value.image.name, value.renditions_ready)
+        request = self.context.get("request")
+        if request is None:
+            return urls
+        return {
+            rendition: {
+                extension: request.build_absolute_uri(url)
+                for extension, url in formats.items()
+            }
+            for rendition, formats in urls.items()
+        }
+
+
+class RecipeSerializer(TimedDataMixin, serializers.ModelSerializer):
     tags = TagSerializer(many=True, read_only=True)
     author = AuthorSerializer(read_only=True)
     ingredients = RecipeIngredientsSerializer(
@@ -158,6 +230,7 @@ class RecipeSerializer(serializers.ModelSerializer):
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
     is_subscribed = serializers.SerializerMethodField()
+    image_renditions = ImageRenditionsField()
 
     class Meta:
         fields = (
@@ -170,19 +243,37 @@ class RecipeSerializer(serializers.ModelSerializer):
             "is_subscribed",
             "name",
             "image",
+            "image_renditions",
             "text",
             "cooking_time",
+            "favorites_count",
+            "shopping_cart_count",
+        )
+        read_only_fields = (
+            "id",
+            "author",
+            "favorites_count",
+            "shopping_cart_count",
         )
-        read_only_fields = ("id", "author")
         model = Recipe
+        list_serializer_class = TimedListSerializer
+
+    def to_representation(self, instance):
+        if hasattr(instance, "is_subscribed"):
+            instance.author.is_subscribed = instance.is_subscribed
+        return super().to_representation(instance)
 
     def get_is_favorited(self, obj):
+        if hasattr(obj, "is_favorited"):
+            return obj.is_favorited
         request = self.context["request"]
         if request.user.is_anonymous:
             return False
         return Favorite.objects.filter(user=request.user, recipe=obj).exists()
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, "is_in_shopping_cart"):
+            return obj.is_in_shopping_cart
         request = self.context["request"]
         if request.user.is_anonymous:
             return False
@@ -191,6 +282,8 @@ class RecipeSerializer(serializers.ModelSerializer):
         ).exists()
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, "is_subscribed"):
+            return obj.is_subscribed
         request = self.context["request"]
         if request.user.is_anonymous:
             return False
@@ -200,9 +293,7 @@ class RecipeSerializer(serializers.ModelSerializer):
 
 
 class RecipeCreateSerializer(serializers.ModelSerializer):
-    tags = serializers.PrimaryKeyRelatedField(
-        many=True, queryset=Tag.objects.all()
-    )
+    tags = PrimaryKeyListField(queryset=Tag.objects.all())
     ingredients = RecipeIngredientCreateSerializer(
         source="recipe_ingredients", many=True
     )
@@ -222,24 +313,30 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         )
 
     def validate(self, data):
-        data["tags"] = [item.id for item in data.get("tags")]
-        if not data.get("tags"):
-            raise serializers.ValidationError("Recipe must have tags")
-        if len(data.get("tags")) != len(set(data.get("tags"))):
-            raise serializers.ValidationError("Recipe must have unique tags")
-        if not data.get("recipe_ingredients"):
-            raise serializers.ValidationError("Recipe must have ingredients")
-        if len(data.get("recipe_ingredients")) != len(
-            set(
-                [
-                    item["ingredient"].name
-                    for item in data.get("recipe_ingredients")
-                ]
-            )
-        ):
-            raise serializers.ValidationError(
-                "Recipe must have unique ingredients"
-            )
+        if "tags" in data:
+            data["tags"] = [item.id for item in data["tags"]]
+            if not data["tags"]:
+                raise serializers.ValidationError("Recipe must have tags")
+            if len(data["tags"]) != len(set(data["tags"])):
+                raise serializers.ValidationError(
+                    "Recipe must have unique tags"
+                )
+        if "recipe_ingredients" in data:
+            if not data["recipe_ingredients"]:
+                raise serializers.ValidationError(
+                    "Recipe must have ingredients"
+                )
+            if len(data["recipe_ingredients"]) != len(
+                set(
+                    [
+                        item["ingredient"].name
+                        for item in data["recipe_ingredients"]
+                    ]
+                )
+            ):
+                raise serializers.ValidationError(
+                    "Recipe must have unique ingredients"
+                )
 
         return data
 
@@ -248,61 +345,68 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         tags = validated_data.pop("tags")
         ingredients = validated_data.pop("recipe_ingredients")
         recipe = Recipe.objects.create(**validated_data)
+        validated_data["image"].close()
+        change_counter(
+            User.objects.filter(pk=recipe.author_id), "recipes_count", 1
+        )
         recipe.tags.set(tags)
         add_ingredients_to_recipe(recipe, ingredients)
+        schedule_renditions(recipe.image.name)
 
         return recipe
 
     @transaction.atomic
     def update(self, instance, validated_data):
-        tags = validated_data.pop("tags")
-        ingredients = validated_data.pop("recipe_ingredients")
-        instance.tags.set(tags)
-        instance.recipe_ingredients.all().delete()
-        add_ingredients_to_recipe(instance, ingredients)
-
-        return super().update(instance, validated_data)
-
-
-class SubscriptionSerializer(serializers.ModelSerializer):
-    user = serializers.HiddenField(default=serializers.CurrentUserDefault())
-    author = serializers.HiddenField(default=None)
-
-    def validate_author(self, value):
-        user_id = self.context["request"].parser_context["kwargs"]["id"]
-        return get_object_or_404(User, pk=user_id)
-
-    def validate(self, data):
-        if data["user"] == data["author"]:
-            raise serializers.ValidationError(
-                "You can't subscribe to yourself"
+        tags = validated_data.pop("tags", None)
+        ingredients = validated_data.pop("recipe_ingredients", None)
+        if tags is not None:
+            instance.tags.set(tags)
+        if ingredients is not None and update_recipe_ingredients(
+            instance, ingredients
+        ):
+            user_ids = list(
+                instance.shopping_cart.values_list("user_id", flat=True)
             )
-        return data
+            transaction.on_commit(lambda: invalidate_shopping_list(*user_ids))
+
+        instance = super().update(instance, validated_data)
+        if "image" in validated_data:
+            validated_data["image"].close()
+            instance.renditions_ready = False
+            Recipe.objects.filter(pk=instance.pk).update(
+                renditions_ready=False
+            )
+            schedule_renditions(instance.image.name)
+        return instance
 
-    class Meta:
-        fields = ("user", "author")
-        model = Subscription
+    def to_representation(self, instance):
+        request = self.context["request"]
+        instance = get_recipe_queryset(request.user).get(pk=instance.pk)
+        return RecipeSerializer(instance, context=self.context).data
 
 
-class RecipeSmallSerializer(serializers.ModelSerializer):
+class RecipeSmallSerializer(TimedDataMixin, serializers.ModelSerializer):
+    image_renditions = ImageRenditionsField()
+
     class Meta:
         fields = (
             "id",
             "name",
             "image",
+            "image_renditions",
             "cooking_time",
         )
         model = Recipe
 
 
-class SubscriptionListSerializer(serializers.ModelSerializer):
+class SubscriptionListSerializer(TimedDataMixin, serializers.ModelSerializer):
     email = serializers.EmailField(source="author.email")
     id = serializers.IntegerField(source="author.id")
     username = serializers.CharField(source="author.username")
     first_name = serializers.CharField(source="author.first_name")
     last_name = serializers.CharField(source="author.last_name")
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.SerializerMethodField()
+    recipes_count = serializers.IntegerField(source="author.recipes_count")
 
     class Meta:
         model = Subscription
@@ -315,14 +419,15 @@ class SubscriptionListSerializer(serializers.ModelSerializer):
             "recipes",
             "recipes_count",
         )
+        list_serializer_class = TimedListSerializer
 
     def get_recipes(self, obj):
-        recipes = Recipe.objects.filter(author=obj.author)
-        request = self.context["request"]
-        limit = request.query_params.get("recipes_limit")
-        if limit:
-            recipes = recipes[: int(limit)]
+        if hasattr(obj.author, "limited_recipes"):
+            recipes = obj.author.limited_recipes
+        else:
+            recipes = Recipe.objects.filter(author=obj.author)
+            request = self.context["request"]
+            limit = request.query_params.get("recipes_limit")
+            if limit:
+                recipes = recipes[: int(limit)]
         return RecipeSmallSerializer(recipes, many=True).data
-
-    def get_recipes_count(self, obj):
-        return Recipe.objects.filter(author=obj.author).count()
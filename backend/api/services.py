@@ -1,14 +1,39 @@
+from hashlib import md5
+from urllib.parse import urlencode
+from uuid import uuid4
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db import transaction
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import (BooleanField, Exists, F, IntegerField, OuterRef,
+                              Prefetch, Subquery, Sum, Value)
+from django.db.models.functions import Coalesce, Greatest
+from django.http import HttpResponse, HttpResponseNotModified
 from django.shortcuts import get_object_or_404
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import parse_etags, quote_etag
 from rest_framework import filters, status
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 from rest_framework.response import Response
 
-from recipes.models import Recipe, RecipeIngredient
+from api.renderers import TimedJSONRenderer
+from recipes.cache import get_table_version, get_tables_version
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            ShoppingCart, Tag)
+from users.models import Subscription
 
 User = get_user_model()
 
+SHOPPING_LIST_CACHE_TIMEOUT = 60 * 60 * 24
+INGREDIENT_SEARCH_LIMIT = 50
+RECIPE_COUNTERS = {
+    Favorite: "favorites_count",
+    ShoppingCart: "shopping_cart_count",
+}
+REFERENCE_CACHE_TIMEOUT = 60 * 60 * 24
+
 
 @transaction.atomic
 def add_ingredients_to_recipe(recipe, ingredients):
@@ -23,6 +48,219 @@ def add_ingredients_to_recipe(recipe, ingredients):
     RecipeIngredient.objects.bulk_create(recipe_ingredients)
 
 
+@transaction.atomic
+def update_recipe_ingredients(recipe, ingredients):
+    """
+    Bring the recipe's ingredients in line with the payload.
+
+    Only rows that were added, removed or changed their amount are
+    written. Returns whether anything changed.
+    """
+    current = {
+        item.ingredient_id: item for item in recipe.recipe_ingredients.all()
+    }
+    amounts = {
+        ingredient_data["ingredient"].pk: ingredient_data["amount"]
+        for ingredient_data in ingredients
+    }
+    removed = current.keys() - amounts.keys()
+    added = [
+        RecipeIngredient(
+            recipe=recipe, ingredient_id=ingredient_id, amount=amount
+        )
+        for ingredient_id, amount in amounts.items()
+        if ingredient_id not in current
+    ]
+    changed = []
+    for ingredient_id, item in current.items():
+        if ingredient_id in amounts and item.amount != amounts[ingredient_id]:
+            item.amount = amounts[ingredient_id]
+            changed.append(item)
+    if removed:
+        recipe.recipe_ingredients.filter(ingredient_id__in=removed).delete()
+    if changed:
+        RecipeIngredient.objects.bulk_update(changed, ["amount"])
+    if added:
+        RecipeIngredient.objects.bulk_create(added)
+    return bool(removed or changed or added)
+
+
+def annotate_user_flags(queryset, user):
+    """
+    Annotate recipes with per-user boolean flags.
+
+    Serializers read ``is_favorited``, ``is_in_shopping_cart`` and
+    ``is_subscribed`` from the annotations instead of running
+    an ``exists()`` query per recipe.
+    """
+    if user.is_anonymous:
+        false = Value(False, output_field=BooleanField())
+        return queryset.annotate(
+            is_favorited=false,
+            is_in_shopping_cart=false,
+            is_subscribed=false,
+        )
+    return queryset.annotate(
+        is_favorited=Exists(
+            Favorite.objects.filter(user=user, recipe=OuterRef("pk"))
+        ),
+        is_in_shopping_cart=Exists(
+            ShoppingCart.objects.filter(user=user, recipe=OuterRef("pk"))
+        ),
+        is_subscribed=Exists(
+            Subscription.objects.filter(user=user, author=OuterRef("author"))
+        ),
+    )
+
+
+def annotate_is_subscribed(queryset, user):
+    """
+    Annotate users with whether ``user`` follows them.
+
+    ``UserSerializer`` reads the annotation instead of running an
+    ``exists()`` query per user.
+    """
+    if user.is_anonymous:
+        return queryset.annotate(
+            is_subscribed=Value(False, output_field=BooleanField())
+        )
+    return queryset.annotate(
+        is_subscribed=Exists(
+            Subscription.objects.filter(user=user, author=OuterRef("pk"))
+        )
+    )
+
+
+def get_recipe_queryset(user):
+    """
+    Return recipes of active authors ready for ``RecipeSerializer``.
+
+    The author is joined, tags and ingredients are prefetched and
+    the per-user flags are annotated, so serializing a page of recipes
+    costs a constant number of queries.
+    """
+    queryset = (
+        Recipe.objects.filter(author__is_active=True)
+        .select_related("author")
+        .prefetch_related(
+            "tags",
+            Prefetch(
+                "recipe_ingredients",
+                queryset=RecipeIngredient.objects.select_related("ingredient"),
+            ),
+        )
+    )
+    return annotate_user_flags(queryset, user)
+
+
+def get_subscriptions_queryset(user, recipes_limit=None):
+    """
+    Return subscriptions of the user ready for ``SubscriptionListSerializer``.
+
+    Authors are joined and the newest ``recipes_limit`` recipes
+    of every followed author are prefetched with a single query
+    into ``author.limited_recipes``.
+    """
+    recipes = Recipe.objects.order_by("-pub_date")
+    if recipes_limit is not None:
+        newest_recipes = Recipe.objects.filter(
+            author=OuterRef("author")
+        ).order_by("-pub_date")
+        recipes = recipes.filter(
+            pk__in=Subquery(newest_recipes.values("pk")[:recipes_limit])
+        )
+    return (
+        Subscription.objects.filter(user=user)
+        .select_related("author")
+        .prefetch_related(
+            Prefetch(
+                "author__recipes",
+                queryset=recipes,
+                to_attr="limited_recipes",
+            )
+        )
+        .order_by("id")
+    )
+
+
+def get_shopping_list(user):
+    """
+    Return ``(name, measurement_unit, amount)`` rows of the user's cart.
+
+    Amounts are summed in the database, one row per ingredient.
+    """
+    return (
+        ShoppingCart.objects.filter(user=user)
+        .values_list(
+            "recipe__recipe_ingredients__ingredient__name",
+            "recipe__recipe_ingredients__ingredient__measurement_unit",
+        )
+        .annotate(
+            amount=Coalesce(
+                Sum(
+                    "recipe__recipe_ingredients__amount",
+                    output_field=IntegerField(),
+                ),
+                0,
+            )
+        )
+        .order_by("recipe__recipe_ingredients__ingredient__name")
+    )
+
+
+def get_shopping_list_version(user_id):
+    """
+    Return the current version token of the user's shopping list.
+
+    Return ``None`` when the cache is unavailable.
+    """
+    key = f"shopping_list:version:{user_id}"
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid4().hex, SHOPPING_LIST_CACHE_TIMEOUT)
+        version = cache.get(key)
+    return version
+
+
+def invalidate_shopping_list(*user_ids):
+    """Drop the version tokens, so cached shopping lists are rebuilt."""
+    cache.delete_many(
+        [f"shopping_list:version:{user_id}" for user_id in user_ids]
+    )
+
+
+def get_cached_shopping_list(user, version):
+    """
+    Return shopping list rows of the given version, caching them.
+
+    There is at most one row per ingredient, so the cached
+    aggregate stays small however many recipes are in the cart.
+    Without a version the rows are read uncached.
+    """
+    if version is None:
+        return list(get_shopping_list(user))
+    key = f"shopping_list:{user.id}:{version}"
+    rows = cache.get(key)
+    if rows is None:
+        rows = list(get_shopping_list(user))
+        cache.set(key, rows, SHOPPING_LIST_CACHE_TIMEOUT)
+    return rows
+
+
+def filter_by_tags(tags):
+    """
+    Return an ``EXISTS`` condition matching recipes with any of the tags.
+
+    Unlike joining the tags, it yields every recipe once, so the
+    queryset needs no ``DISTINCT`` over full recipe rows.
+    """
+    return Exists(
+        Recipe.tags.through.objects.filter(
+            recipe=OuterRef("pk"), tag__slug__in=tags
+        )
+    )
+
+
 class RecipeFilter(filters.BaseFilterBackend):
     def filter_queryset(self, request, queryset, view):
         is_in_shopping_cart = request.query_params.get("is_in_shopping_cart")
@@ -37,29 +275,302 @@ class RecipeFilter(filters.BaseFilterBackend):
         if author:
             queryset = queryset.filter(author__id=author)
         if tags:
-            return queryset.filter(tags__slug__in=tags).distinct()
+            return queryset.filter(filter_by_tags(tags))
 
         return queryset
 
 
+class RecipeOrderingFilter(filters.OrderingFilter):
+    """
+    Ordering filter breaking ties by publication date and id.
+
+    Most recipes share a counter value or a zero score, and without a
+    unique tail page-number pagination could repeat or skip them.
+    """
+
+    tie_breaker = ("-pub_date", "-id")
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if not ordering:
+            return ordering
+        fields = {field.lstrip("-") for field in ordering}
+        return (
+            *ordering,
+            *(
+                field
+                for field in self.tie_breaker
+                if field.lstrip("-") not in fields
+            ),
+        )
+
+
+class IngredientSearchFilter(filters.BaseFilterBackend):
+    def filter_queryset(self, request, queryset, view):
+        name = request.query_params.get("name")
+        if name:
+            return queryset.search(name)[:INGREDIENT_SEARCH_LIMIT]
+        return queryset
+
+
+def change_counter(queryset, field, delta):
+    """Atomically add ``delta`` to a counter column of the queryset rows."""
+    if delta:
+        queryset.update(**{field: Greatest(F(field) + delta, 0)})
+
+
 def process_recipe_saving(request, pk, serializer, model):
-    recipe = get_object_or_404(Recipe, id=pk)
+    """
+    Add or remove a recipe of the user's favorites or shopping cart.
+
+    Adding takes three queries: the recipe lookup, a single INSERT
+    guarded by the unique constraint, which reports duplicates,
+    and the counter update. Removing takes a DELETE and the counter
+    update, plus a recipe lookup only when nothing was deleted.
+    """
+    counter = RECIPE_COUNTERS[model]
     if request.method == "POST":
-        serializer = serializer(
-            data={
-                "recipe": recipe.id,
-                "user": request.user.id,
-            },
-            context={"request": request},
+        recipe = get_object_or_404(Recipe, id=pk)
+        try:
+            with transaction.atomic():
+                instance = model.objects.create(
+                    user=request.user, recipe=recipe
+                )
+                change_counter(Recipe.objects.filter(pk=pk), counter, 1)
+        except IntegrityError:
+            raise ValidationError({"errors": "Recipe is already added"})
+        if model is ShoppingCart:
+            invalidate_shopping_list(request.user.id)
+        return Response(
+            serializer(instance).data, status=status.HTTP_201_CREATED
         )
-        serializer.is_valid(raise_exception=True)
-        serializer.save()
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
 
-    model.objects.filter(recipe=recipe, user=request.user).delete()
+    with transaction.atomic():
+        deleted, _ = model.objects.filter(
+            recipe_id=pk, user=request.user
+        ).delete()
+        change_counter(Recipe.objects.filter(pk=pk), counter, -deleted)
+    if not deleted:
+        get_object_or_404(Recipe, id=pk)
+    if model is ShoppingCart:
+        invalidate_shopping_list(request.user.id)
     return Response(status=status.HTTP_204_NO_CONTENT)
 
 
+def process_subscription(request, author):
+    """
+    Subscribe the user to the author or unsubscribe.
+
+    Subscribing is a single INSERT guarded by the unique constraint
+    plus the follower counter update; unsubscribing is a DELETE plus
+    the counter update.
+    """
+    authors = User.objects.filter(pk=author.pk)
+    if request.method == "POST":
+        if author == request.user:
+            raise ValidationError(
+                {"errors": "You can't subscribe to yourself"}
+            )
+        try:
+            with transaction.atomic():
+                subscription = Subscription.objects.create(
+                    user=request.user, author=author
+                )
+                change_counter(authors, "followers_count", 1)
+        except IntegrityError:
+            raise ValidationError(
+                {"errors": "You are already subscribed to this author"}
+            )
+        return subscription
+
+    with transaction.atomic():
+        deleted, _ = Subscription.objects.filter(
+            author=author, user=request.user
+        ).delete()
+        change_counter(authors, "followers_count", -deleted)
+    return None
+
+
+@transaction.atomic
+def process_bulk_recipe_saving(request, recipe_ids, model):
+    """
+    Add or remove several recipes of the user's favorites or cart.
+
+    Existence is checked with one query, rows are inserted with one
+    ``bulk_create`` or removed with one ``DELETE``. Returns the status
+    of every requested id.
+
+    The recipes and the user's existing rows are locked first, so the
+    rows written, and the counter deltas taken from them, cannot be
+    changed by a concurrent toggle before the transaction commits.
+    """
+    counter = RECIPE_COUNTERS[model]
+    found = set(
+        Recipe.objects.select_for_update()
+        .filter(pk__in=recipe_ids)
+        .order_by("pk")
+        .values_list("pk", flat=True)
+    )
+    saved = set(
+        model.objects.select_for_update()
+        .filter(user=request.user, recipe_id__in=found)
+        .values_list("recipe_id", flat=True)
+    )
+    if request.method == "POST":
+        changed = found - saved
+        model.objects.bulk_create(
+            [model(user=request.user, recipe_id=pk) for pk in changed],
+            ignore_conflicts=True,
+        )
+        statuses = {True: "created", False: "exists"}
+        delta = 1
+    else:
+        changed = saved
+        model.objects.filter(user=request.user, recipe_id__in=changed).delete()
+        statuses = {True: "deleted", False: "missing"}
+        delta = -1
+    change_counter(Recipe.objects.filter(pk__in=changed), counter, delta)
+    if model is ShoppingCart and changed:
+        transaction.on_commit(
+            lambda: invalidate_shopping_list(request.user.id)
+        )
+    results = []
+    for pk in recipe_ids:
+        if pk not in found:
+            result = "not_found"
+        else:
+            result = statuses[pk in changed]
+        results.append({"id": pk, "status": result})
+    return Response(results)
+
+
+class RecipeCursorPaginator(CursorPagination):
+    page_size = 6
+    page_size_query_param = "limit"
+    ordering = ("-pub_date", "-id")
+
+
 class RecipePaginator(PageNumberPagination):
+    """
+    Page number pagination with an opt-in keyset mode.
+
+    ``?pagination=cursor`` switches to ``RecipeCursorPaginator``, which
+    walks the ``pub_date`` index instead of counting the whole result
+    and scanning past an offset.
+    """
+
     page_size = 6
     page_size_query_param = "limit"
+    mode_query_param = "pagination"
+    cursor_paginator = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if request.query_params.get(self.mode_query_param) == "cursor":
+            self.cursor_paginator = RecipeCursorPaginator()
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view
+            )
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+def get_cached_json_response(request, key, timeout, get_data):
+    """
+    Return ``get_data()`` rendered as JSON, caching the rendered bytes.
+
+    The body is sent with an ``ETag``, so clients and nginx revalidate
+    with a cheap conditional request.
+    """
+    entry = cache.get(key)
+    if entry is None:
+        body = TimedJSONRenderer().render(get_data())
+        entry = (quote_etag(md5(body).hexdigest()), body)
+        cache.set(key, entry, timeout)
+    etag, body = entry
+    if etag in parse_etags(request.headers.get("If-None-Match", "")):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(body, content_type="application/json")
+    response["ETag"] = etag
+    patch_cache_control(response, public=True, no_cache=True)
+    return response
+
+
+class ReferenceCacheMixin:
+    """
+    Serve list responses of reference data as pre-rendered JSON.
+
+    Rendered bytes are cached per table version and query string.
+    """
+
+    def list(self, request, *args, **kwargs):
+        model = self.queryset.model
+        query = urlencode(sorted(request.query_params.lists()), doseq=True)
+        key = (
+            f"reference:{model._meta.label_lower}:"
+            f"{get_table_version(model)}:{query}"
+        )
+        view = super().list
+        return get_cached_json_response(
+            request,
+            key,
+            REFERENCE_CACHE_TIMEOUT,
+            lambda: view(request, *args, **kwargs).data,
+        )
+
+
+class AnonymousRecipeCacheMixin:
+    """
+    Serve recipe list and detail responses of anonymous users from cache.
+
+    Responses are keyed on the normalized ``tags``, ``author``, ``page``
+    and ``limit`` parameters under the generation of the recipe, tag,
+    ingredient and user tables, which signals bump on every write.
+    Counters updated in bulk are refreshed when ``RECIPE_CACHE_TIMEOUT``
+    expires, which also bounds staleness between workers with a
+    process-local cache. Requests with other parameters bypass the cache.
+    """
+
+    cache_models = (Recipe, Tag, Ingredient, User)
+    cache_query_params = {"tags", "author", "page", "limit"}
+
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            request, super().retrieve, *args, **kwargs
+        )
+
+    def get_cached_response(self, request, view, *args, **kwargs):
+        params = request.query_params
+        if request.user.is_authenticated or not set(params).issubset(
+            self.cache_query_params
+        ):
+            return view(request, *args, **kwargs)
+        query = urlencode(
+            {
+                "tags": sorted(set(params.getlist("tags"))),
+                "author": params.get("author", ""),
+                "page": params.get("page", "1"),
+                "limit": params.get("limit", self.paginator.page_size),
+            },
+            doseq=True,
+        )
+        key = (
+            f"recipes:{get_tables_version(*self.cache_models)}:"
+            f"{request.scheme}://{request.get_host()}:{self.action}:"
+            f"{kwargs.get('pk', '')}:{query}"
+        )
+        response = get_cached_json_response(
+            request,
+            key,
+            settings.RECIPE_CACHE_TIMEOUT,
+            lambda: view(request, *args, **kwargs).data,
+        )
+        patch_vary_headers(response, ["Authorization"])
+        return response
@@ -0,0 +1,160 @@
+import base64
+import os
+import shutil
+import tempfile
+from io import BytesIO
+from time import perf_counter
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+from rest_framework.test import APITestCase
+
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+
+User = get_user_model()
+
+SAVEPOINT_STATEMENTS = (
+    "SAVEPOINT",
+    "RELEASE SAVEPOINT",
+    "ROLLBACK TO SAVEPOINT",
+)
+# Wall-clock budget of a single request, generous enough for a loaded
+# laptop; 0 disables it, as it does by default on shared CI runners.
+LATENCY_BUDGET_MS = float(
+    os.getenv("QUERY_BUDGET_LATENCY_MS", 0 if os.getenv("CI") else 1000)
+)
+
+
+def make_image():
+    buffer = BytesIO()
+    Image.new("RGB", (64, 64), "orange").save(buffer, "PNG")
+    return (
+        "data:image/png;base64," + base64.b64encode(buffer.getvalue()).decode()
+    )
+
+
+@override_settings(
+    CACHES={
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "api-tests",
+        }
+    },
+    INGREDIENT_CATALOGUE_ENABLED=False,
+    PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"],
+)
+class QueryCountTestCase(APITestCase):
+    """
+    API test case counting the queries each request makes.
+
+    Savepoints of the atomic blocks nested in the test transaction are
+    not counted, as requests served outside tests do not issue them.
+    Uploaded images go to a temporary media root. ``assertQueries()``
+    also fails a request slower than ``QUERY_BUDGET_LATENCY_MS``.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.media_root = tempfile.mkdtemp()
+        cls.media_settings = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.media_settings.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.media_settings.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    @staticmethod
+    def create_user(username, **kwargs):
+        return User.objects.create(
+            email=f"{username}@foodgram.local",
+            username=username,
+            first_name=username,
+            last_name="test",
+            **kwargs,
+        )
+
+    @staticmethod
+    def create_recipe(author, name, tags=(), ingredients=()):
+        recipe = Recipe.objects.create(
+            author=author,
+            name=name,
+            image="images/recipes/borsch.jpg",
+            text=name,
+            cooking_time=10,
+        )
+        recipe.tags.set(tags)
+        RecipeIngredient.objects.bulk_create(
+            [
+                RecipeIngredient(
+                    recipe=recipe, ingredient=ingredient, amount=100
+                )
+                for ingredient in ingredients
+            ]
+        )
+        return recipe
+
+    @staticmethod
+    def create_tags(count):
+        Tag.objects.bulk_create(
+            [
+                Tag(
+                    name=f"tag {number}",
+                    color=f"#c{number:05x}",
+                    slug=f"tag-{number}",
+                )
+                for number in range(count)
+            ]
+        )
+        return list(Tag.objects.order_by("id"))
+
+    @staticmethod
+    def create_ingredients(count):
+        Ingredient.objects.bulk_create(
+            [
+                Ingredient(name=f"ingredient {number}", measurement_unit="g")
+                for number in range(count)
+            ]
+        )
+        return list(Ingredient.objects.order_by("id"))
+
+    def request(self, user, method, url, data=None):
+        """Return the response and the number of queries it made."""
+        self.client.force_authenticate(user)
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(url, data, format="json")
+        count = sum(
+            not query["sql"].startswith(SAVEPOINT_STATEMENTS)
+            for query in queries
+        )
+        return response, count
+
+    def assertQueries(
+        self, max_queries, user, method, url, data=None, status=200
+    ):
+        """Request the URL and check its status, query and time budgets."""
+        started = perf_counter()
+        response, count = self.request(user, method, url, data)
+        elapsed = (perf_counter() - started) * 1000
+        self.assertEqual(
+            response.status_code, status, getattr(response, "data", None)
+        )
+        self.assertLessEqual(
+            count, max_queries, f"{method.upper()} {url} made {count} queries"
+        )
+        if LATENCY_BUDGET_MS:
+            self.assertLessEqual(
+                elapsed,
+                LATENCY_BUDGET_MS,
+                f"{method.upper()} {url} took {elapsed:.0f} ms",
+            )
+        return response
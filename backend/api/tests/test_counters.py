@@ -0,0 +1,43 @@
+from api.tests.base import QueryCountTestCase
+from recipes.models import Recipe
+from users.models import User
+
+
+class CounterTests(QueryCountTestCase):
+    """Saving a loaded row keeps counter updates committed meanwhile."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = cls.create_user("author")
+        cls.tags = cls.create_tags(1)
+        cls.recipe = cls.create_recipe(cls.author, "recipe", cls.tags)
+
+    def test_recipe_patch_keeps_counters(self):
+        recipe = Recipe.objects.get(pk=self.recipe.pk)
+        Recipe.objects.filter(pk=recipe.pk).update(
+            favorites_count=3, shopping_cart_count=2
+        )
+        recipe.name = "renamed"
+        recipe.save()
+        self.request(
+            self.author,
+            "patch",
+            f"/api/recipes/{recipe.id}/",
+            {"name": "patched"},
+        )
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.name, "patched")
+        self.assertEqual(recipe.favorites_count, 3)
+        self.assertEqual(recipe.shopping_cart_count, 2)
+
+    def test_user_save_keeps_counters(self):
+        user = User.objects.get(pk=self.author.pk)
+        User.objects.filter(pk=user.pk).update(
+            recipes_count=4, followers_count=5
+        )
+        user.set_password("new-password-1")
+        user.save()
+        user.refresh_from_db()
+        self.assertTrue(user.check_password("new-password-1"))
+        self.assertEqual(user.recipes_count, 4)
+        self.assertEqual(user.followers_count, 5)
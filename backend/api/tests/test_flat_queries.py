@@ -0,0 +1,54 @@
+from api.tests.base import QueryCountTestCase
+from users.models import Subscription
+
+
+class FlatQueryCountTests(QueryCountTestCase):
+    """Query counts of paginated lists do not grow with their pages."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = cls.create_user("user")
+        cls.authors = [
+            cls.create_user(f"author{number}") for number in range(7)
+        ]
+        tags = cls.create_tags(3)
+        ingredients = cls.create_ingredients(6)
+        for author in cls.authors:
+            for number in range(4):
+                cls.create_recipe(
+                    author, f"{author.username} {number}", tags, ingredients
+                )
+        Subscription.objects.bulk_create(
+            [
+                Subscription(user=cls.user, author=author)
+                for author in cls.authors
+            ]
+        )
+
+    def test_recipe_list(self):
+        counts = set()
+        for limit in (1, 6):
+            response, count = self.request(
+                self.user, "get", f"/api/recipes/?limit={limit}"
+            )
+            self.assertEqual(len(response.data["results"]), limit)
+            counts.add(count)
+        self.assertEqual(len(counts), 1, counts)
+
+    def test_subscriptions(self):
+        """Seven followed authors give a page of six and a page of one."""
+        counts = set()
+        for page, authors in ((1, 6), (2, 1)):
+            for recipes_limit in (1, 3):
+                response, count = self.request(
+                    self.user,
+                    "get",
+                    f"/api/users/subscriptions/?page={page}"
+                    f"&recipes_limit={recipes_limit}",
+                )
+                results = response.data["results"]
+                self.assertEqual(len(results), authors)
+                for author in results:
+                    self.assertEqual(len(author["recipes"]), recipes_limit)
+                counts.add(count)
+        self.assertEqual(len(counts), 1, counts)
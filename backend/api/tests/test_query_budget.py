@@ -0,0 +1,161 @@
+from api.tests.base import QueryCountTestCase, make_image
+from recipes.models import Favorite, ShoppingCart
+from users.models import Subscription
+
+PASSWORD = "budget-password-1"
+
+
+class QueryBudgetTests(QueryCountTestCase):
+    """
+    Query budgets of the API routes.
+
+    A route making more queries than its budget fails, so N+1
+    regressions in serializers are caught before deploying.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = cls.create_user("user")
+        cls.user.set_password(PASSWORD)
+        cls.user.save()
+        cls.admin = cls.create_user("admin", is_staff=True)
+        cls.authors = [
+            cls.create_user(f"author{number}") for number in range(5)
+        ]
+        cls.tags = cls.create_tags(4)
+        cls.ingredients = cls.create_ingredients(20)
+        cls.recipes = [
+            cls.create_recipe(
+                cls.authors[number % 4],
+                f"recipe {number}",
+                cls.tags[1:] if number % 2 else cls.tags[:3],
+                cls.ingredients[number:][:8],
+            )
+            for number in range(12)
+        ]
+        for model in (Favorite, ShoppingCart):
+            model.objects.bulk_create(
+                [
+                    model(user=cls.user, recipe=recipe)
+                    for recipe in cls.recipes[:4]
+                ]
+            )
+        Subscription.objects.bulk_create(
+            [
+                Subscription(user=cls.user, author=author)
+                for author in cls.authors[:3]
+            ]
+        )
+        cls.saved = [recipe.id for recipe in cls.recipes[4:8]]
+
+    def get_payload(self):
+        return {
+            "ingredients": [
+                {"id": ingredient.id, "amount": 10}
+                for ingredient in self.ingredients[:10]
+            ],
+            "tags": [tag.id for tag in self.tags[:3]],
+            "image": make_image(),
+            "name": "budget recipe",
+            "text": "budget",
+            "cooking_time": 10,
+        }
+
+    def test_recipe_lists(self):
+        tags = "&".join(f"tags={tag.slug}" for tag in self.tags[:3])
+        self.assertQueries(4, None, "get", "/api/recipes/")
+        self.assertQueries(4, self.user, "get", f"/api/recipes/?{tags}")
+        self.assertQueries(4, self.user, "get", "/api/recipes/?is_favorited=1")
+        self.assertQueries(
+            3, self.user, "get", "/api/recipes/?pagination=cursor&limit=20"
+        )
+
+    def test_recipe_detail(self):
+        self.assertQueries(
+            3, self.user, "get", f"/api/recipes/{self.recipes[0].id}/"
+        )
+
+    def test_recipe_writes(self):
+        response = self.assertQueries(
+            13,
+            self.user,
+            "post",
+            "/api/recipes/",
+            self.get_payload(),
+            status=201,
+        )
+        url = f"/api/recipes/{response.data['id']}/"
+        self.assertQueries(
+            13,
+            self.user,
+            "patch",
+            url,
+            {**self.get_payload(), "name": "budget recipe, patched"},
+        )
+        self.assertQueries(12, self.user, "delete", url, status=204)
+
+    def test_favorite_and_shopping_cart(self):
+        recipe_id, bulk = self.saved[0], {"recipes": self.saved[1:]}
+        for path in ("favorite", "shopping_cart"):
+            url = f"/api/recipes/{recipe_id}/{path}/"
+            self.assertQueries(3, self.user, "post", url, status=201)
+            self.assertQueries(2, self.user, "delete", url, status=204)
+            url = f"/api/recipes/{path}/"
+            self.assertQueries(4, self.user, "post", url, bulk)
+            self.assertQueries(4, self.user, "delete", url, bulk)
+
+    def test_download_shopping_cart(self):
+        url = "/api/recipes/download_shopping_cart/"
+        self.assertQueries(1, self.user, "get", url)
+        self.assertQueries(1, self.user, "get", f"{url}?type=pdf")
+
+    def test_users(self):
+        self.assertQueries(3, self.user, "get", "/api/users/")
+        self.assertQueries(
+            2, self.user, "get", f"/api/users/{self.authors[0].id}/"
+        )
+        self.assertQueries(0, self.user, "get", "/api/users/me/")
+
+    def test_users_list_as_staff_is_flat(self):
+        """Staff see every user, so the page size must not add queries."""
+        first_page, first_count = self.request(
+            self.admin, "get", "/api/users/"
+        )
+        last_page, last_count = self.request(
+            self.admin, "get", "/api/users/?page=2"
+        )
+        self.assertEqual(len(first_page.data["results"]), 6)
+        self.assertEqual(len(last_page.data["results"]), 1)
+        self.assertEqual(first_count, last_count)
+        self.assertLessEqual(first_count, 3)
+
+    def test_subscriptions(self):
+        author = self.authors[3]
+        self.assertQueries(
+            3, self.user, "get", "/api/users/subscriptions/?recipes_limit=3"
+        )
+        url = f"/api/users/{author.id}/subscribe/"
+        self.assertQueries(4, self.user, "post", url, status=201)
+        self.assertQueries(3, self.user, "delete", url, status=204)
+
+    def test_reference_lists(self):
+        tag, ingredient = self.tags[0], self.ingredients[0]
+        self.assertQueries(1, None, "get", "/api/tags/")
+        self.assertQueries(1, None, "get", f"/api/tags/{tag.id}/")
+        self.assertQueries(1, None, "get", "/api/ingredients/")
+        self.assertQueries(1, None, "get", "/api/ingredients/?name=ingr")
+        self.assertQueries(
+            1, None, "get", f"/api/ingredients/{ingredient.id}/"
+        )
+
+    def test_token_login(self):
+        self.assertQueries(
+            4,
+            None,
+            "post",
+            "/api/auth/token/login/",
+            {"email": self.user.email, "password": PASSWORD},
+        )
+
+    def test_metrics(self):
+        self.assertQueries(0, self.admin, "get", "/api/metrics/")
@@ -0,0 +1,63 @@
+from api.tests.base import QueryCountTestCase
+from recipes.models import Recipe, RecipeIngredient
+
+
+class RecipeUpdateTests(QueryCountTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = cls.create_user("author")
+        cls.tags = cls.create_tags(3)
+        cls.ingredients = cls.create_ingredients(5)
+        cls.recipe = cls.create_recipe(
+            cls.author, "recipe", cls.tags[:2], cls.ingredients[:3]
+        )
+        cls.url = f"/api/recipes/{cls.recipe.id}/"
+
+    def get_rows(self):
+        return list(
+            RecipeIngredient.objects.filter(recipe=self.recipe)
+            .order_by("id")
+            .values_list("id", "ingredient_id", "amount")
+        )
+
+    def test_title_only_patch(self):
+        rows = self.get_rows()
+        response = self.assertQueries(
+            7, self.author, "patch", self.url, {"name": "renamed"}
+        )
+        self.assertEqual(response.data["name"], "renamed")
+        self.assertEqual(
+            [tag["id"] for tag in response.data["tags"]],
+            [tag.id for tag in self.tags[:2]],
+        )
+        self.assertEqual(self.get_rows(), rows)
+        self.assertEqual(Recipe.objects.get(pk=self.recipe.pk).name, "renamed")
+
+    def test_patch_changes_only_edited_ingredients(self):
+        rows = self.get_rows()
+        ingredients = [
+            {"id": ingredient.id, "amount": 100}
+            for ingredient in self.ingredients[:2]
+        ] + [{"id": self.ingredients[3].id, "amount": 5}]
+        self.assertQueries(
+            16,
+            self.author,
+            "patch",
+            self.url,
+            {"ingredients": ingredients, "tags": [self.tags[2].id]},
+        )
+        self.assertEqual(self.get_rows()[:2], rows[:2])
+        self.assertEqual(
+            [row[1:] for row in self.get_rows()],
+            [(item["id"], item["amount"]) for item in ingredients],
+        )
+        self.assertEqual(
+            list(self.recipe.tags.values_list("id", flat=True)),
+            [self.tags[2].id],
+        )
+
+    def test_patch_rejects_empty_tags(self):
+        response, _ = self.request(
+            self.author, "patch", self.url, {"tags": []}
+        )
+        self.assertEqual(response.status_code, 400)
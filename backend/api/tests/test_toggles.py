@@ -0,0 +1,60 @@
+from api.tests.base import QueryCountTestCase
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import Subscription
+
+
+class ToggleQueryTests(QueryCountTestCase):
+    """
+    Query counts of adding and removing favorites, cart items and
+    subscriptions, as documented in ``process_recipe_saving`` and
+    ``process_subscription``.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = cls.create_user("user")
+        cls.author = cls.create_user("author")
+        cls.recipe = cls.create_recipe(cls.author, "recipe")
+
+    def assertToggle(self, url, method, queries, status):
+        response, count = self.request(self.user, method, url)
+        self.assertEqual(response.status_code, status, response.data)
+        self.assertEqual(count, queries, f"{method.upper()} {url}")
+
+    def test_recipe_toggles(self):
+        for path, model, counter in (
+            ("favorite", Favorite, "favorites_count"),
+            ("shopping_cart", ShoppingCart, "shopping_cart_count"),
+        ):
+            with self.subTest(path):
+                url = f"/api/recipes/{self.recipe.id}/{path}/"
+                # Recipe lookup, INSERT and counter update.
+                self.assertToggle(url, "post", 3, 201)
+                # The unique constraint rejects the duplicate INSERT.
+                self.assertToggle(url, "post", 2, 400)
+                self.assertEqual(model.objects.count(), 1)
+                recipe = Recipe.objects.get(pk=self.recipe.pk)
+                self.assertEqual(getattr(recipe, counter), 1)
+                # DELETE and counter update.
+                self.assertToggle(url, "delete", 2, 204)
+                self.assertFalse(model.objects.exists())
+                recipe.refresh_from_db()
+                self.assertEqual(getattr(recipe, counter), 0)
+
+    def test_missing_recipe(self):
+        url = "/api/recipes/0/favorite/"
+        self.assertToggle(url, "post", 1, 404)
+        # A DELETE removing nothing, then the lookup reporting the 404.
+        self.assertToggle(url, "delete", 2, 404)
+
+    def test_subscription_toggles(self):
+        url = f"/api/users/{self.author.id}/subscribe/"
+        # Author lookup, INSERT, counter update and the author's recipes.
+        self.assertToggle(url, "post", 4, 201)
+        self.assertToggle(url, "post", 2, 400)
+        self.assertEqual(Subscription.objects.count(), 1)
+        # Author lookup, DELETE and counter update.
+        self.assertToggle(url, "delete", 3, 204)
+        self.assertFalse(Subscription.objects.exists())
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.followers_count, 0)
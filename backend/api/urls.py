@@ -1,7 +1,9 @@
+from django.conf import settings
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from .views import IngredientViewSet, RecipeViewSet, TagViewSet, UserViewSet
+from .views import (ConnectionMetricsView, IngredientViewSet, MetricsView,
+                    RecipeViewSet, TagViewSet, UserViewSet, as_async_read_view)
 
 app_name = "api"
 
@@ -16,7 +18,53 @@ router.register(
     basename="ingredients",
 )
 
+async_read_urls = []
+if settings.ASYNC_READ_VIEWS:
+    for prefix, viewset, list_actions, detail_actions in (
+        (
+            "recipes",
+            RecipeViewSet,
+            {"get": "list", "post": "create"},
+            {
+                "get": "retrieve",
+                "put": "update",
+                "patch": "partial_update",
+                "delete": "destroy",
+            },
+        ),
+        ("tags", TagViewSet, {"get": "list"}, {"get": "retrieve"}),
+        (
+            "ingredients",
+            IngredientViewSet,
+            {"get": "list"},
+            {"get": "retrieve"},
+        ),
+    ):
+        async_read_urls += [
+            path(
+                f"{prefix}/",
+                as_async_read_view(
+                    viewset, list_actions, basename=prefix, detail=False
+                ),
+                name=f"{prefix}-list",
+            ),
+            path(
+                f"{prefix}/<int:pk>/",
+                as_async_read_view(
+                    viewset, detail_actions, basename=prefix, detail=True
+                ),
+                name=f"{prefix}-detail",
+            ),
+        ]
+
 urlpatterns = (
+    *async_read_urls,
     path("", include(router.urls)),
     path("auth/", include("djoser.urls.authtoken")),
+    path("metrics/", MetricsView.as_view(), name="metrics"),
+    path(
+        "metrics/connections/",
+        ConnectionMetricsView.as_view(),
+        name="connection-metrics",
+    ),
 )
@@ -1,56 +1,79 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db.models import IntegerField, Sum
-from django.db.models.functions import Coalesce
-from django.http import HttpResponse
+from django.db import close_old_connections, transaction
+from django.http import HttpResponse, HttpResponseNotModified
 from django.shortcuts import get_object_or_404
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags, quote_etag
 from djoser.views import UserViewSet as DjoserUserViewSet
-from rest_framework import filters, status, viewsets
+from rest_framework import status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.pagination import PageNumberPagination
-from rest_framework.permissions import (IsAuthenticated,
+from rest_framework.permissions import (SAFE_METHODS, IsAdminUser,
+                                        IsAuthenticated,
                                         IsAuthenticatedOrReadOnly)
 from rest_framework.response import Response
+from rest_framework.views import APIView
 
+from api.exports import EXPORTERS
+from api.metrics import render_metrics
 from api.permissions import IsAdminOrReadOnly, IsOwnerOrIsAdminOrReadOnly
 from api.serializers import (FavoriteSerializer, IngredientSerializer,
-                             RecipeCreateSerializer, RecipeSerializer,
-                             ShoppingCartSerializer,
-                             SubscriptionListSerializer,
-                             SubscriptionSerializer, TagSerializer,
+                             RecipeCreateSerializer, RecipeIdListSerializer,
+                             RecipeSerializer, ShoppingCartSerializer,
+                             SubscriptionListSerializer, TagSerializer,
                              UserSerializer)
-from api.services import RecipeFilter, RecipePaginator, process_recipe_saving
-from recipes.models import Favorite, Ingredient, Recipe, ShoppingCart, Tag
-from users.models import Subscription
+from api.services import (INGREDIENT_SEARCH_LIMIT, AnonymousRecipeCacheMixin,
+                          IngredientSearchFilter, RecipeFilter,
+                          RecipeOrderingFilter, RecipePaginator,
+                          ReferenceCacheMixin, annotate_is_subscribed,
+                          change_counter, get_cached_shopping_list,
+                          get_recipe_queryset, get_shopping_list_version,
+                          get_subscriptions_queryset, invalidate_shopping_list,
+                          process_bulk_recipe_saving, process_recipe_saving,
+                          process_subscription)
+from foodgram.db.metrics import get_connection_metrics
+from recipes.catalogue import get_catalogue
+from recipes.models import Favorite, Ingredient, ShoppingCart, Tag
 
 User = get_user_model()
 
+_read_executor = ThreadPoolExecutor(
+    max_workers=settings.ASYNC_READ_THREADS, thread_name_prefix="async-read"
+)
+
 
 class UserViewSet(DjoserUserViewSet):
     http_method_names = ["get", "post", "delete"]
     serializer_class = UserSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
 
+    def get_queryset(self):
+        return annotate_is_subscribed(
+            super().get_queryset(), self.request.user
+        )
+
     @action(detail=True, methods=["post", "delete"])
     def subscribe(self, request, id):
         author = get_object_or_404(User, id=id)
-        if request.method == "POST":
-            serializer = SubscriptionSerializer(
-                data={
-                    "author": author.id,
-                    "user": request.user.id,
-                },
-                context={"request": request},
-            )
-            serializer.is_valid(raise_exception=True)
-            serializer.save()
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-
-        Subscription.objects.filter(author=author, user=request.user).delete()
-        return Response(status=status.HTTP_204_NO_CONTENT)
+        subscription = process_subscription(request, author)
+        if subscription is None:
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        serializer = SubscriptionListSerializer(
+            subscription, context={"request": request}
+        )
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     @action(detail=False, methods=["get"])
     def subscriptions(self, request):
-        queryset = Subscription.objects.filter(user=request.user)
+        limit = request.query_params.get("recipes_limit")
+        queryset = get_subscriptions_queryset(
+            request.user, int(limit) if limit else None
+        )
         paginator = PageNumberPagination()
         paginated_queryset = paginator.paginate_queryset(queryset, request)
         serializer = SubscriptionListSerializer(
@@ -61,7 +84,7 @@ class UserViewSet(DjoserUserViewSet):
         return paginator.get_paginated_response(serializer.data)
 
 
-class TagViewSet(viewsets.ModelViewSet):
+class TagViewSet(ReferenceCacheMixin, viewsets.ModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = (IsAdminOrReadOnly,)
@@ -70,11 +93,18 @@ class TagViewSet(viewsets.ModelViewSet):
     pagination_class = None
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(AnonymousRecipeCacheMixin, viewsets.ModelViewSet):
     filter_backends = [
-        filters.OrderingFilter,
+        RecipeOrderingFilter,
         RecipeFilter,
     ]
+    ordering = ("-pub_date", "-id")
+    ordering_fields = (
+        "pub_date",
+        "favorites_count",
+        "shopping_cart_count",
+        "popularity_score",
+    )
     permission_classes = (IsOwnerOrIsAdminOrReadOnly,)
     pagination_class = RecipePaginator
     http_method_names = [
@@ -85,13 +115,24 @@ class RecipeViewSet(viewsets.ModelViewSet):
     ]
 
     def get_queryset(self):
-        return Recipe.objects.filter(author__is_active=True)
+        return get_recipe_queryset(self.request.user)
 
     def get_serializer_class(self):
         if self.action in ["create", "partial_update"]:
             return RecipeCreateSerializer
         return RecipeSerializer
 
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        user_ids = list(
+            instance.shopping_cart.values_list("user_id", flat=True)
+        )
+        instance.delete()
+        transaction.on_commit(lambda: invalidate_shopping_list(*user_ids))
+        change_counter(
+            User.objects.filter(pk=instance.author_id), "recipes_count", -1
+        )
+
     @action(
         detail=True,
         methods=["post", "delete"],
@@ -111,51 +152,118 @@ class RecipeViewSet(viewsets.ModelViewSet):
         )
 
     @action(
-        detail=False, methods=["get"], permission_classes=[IsAuthenticated]
+        detail=False,
+        methods=["post", "delete"],
+        permission_classes=[IsAuthenticated],
+        url_path="favorite",
     )
-    def download_shopping_cart(self, request):
-        shopping_carts = (
-            ShoppingCart.objects.filter(user=request.user)
-            .values_list(
-                "recipe__recipe_ingredients__ingredient__name",
-                "recipe__recipe_ingredients__ingredient__measurement_unit",
-            )
-            .annotate(
-                amount=Coalesce(
-                    Sum(
-                        "recipe__recipe_ingredients__amount",
-                        output_field=IntegerField(),
-                    ),
-                    0,
-                )
-            )
-        )
+    def favorite_bulk(self, request):
+        return self.process_bulk(request, Favorite)
 
-        ingredients_list = ["Список покупок"]
-        for ingredient_name, units, amount in shopping_carts:
-            ingredients_list.append(f"{ingredient_name}: {amount} {units}")
+    @action(
+        detail=False,
+        methods=["post", "delete"],
+        permission_classes=[IsAuthenticated],
+        url_path="shopping_cart",
+    )
+    def shopping_cart_bulk(self, request):
+        return self.process_bulk(request, ShoppingCart)
 
-        response = HttpResponse(
-            "\n".join(ingredients_list), content_type="text/plain"
+    def process_bulk(self, request, model):
+        serializer = RecipeIdListSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return process_bulk_recipe_saving(
+            request, serializer.validated_data["recipes"], model
         )
-        response[
-            "Content-Disposition"
-        ] = 'attachment; filename="ingredients.txt"'
 
+    @action(
+        detail=False, methods=["get"], permission_classes=[IsAuthenticated]
+    )
+    def download_shopping_cart(self, request):
+        export_format = request.query_params.get("type", "txt")
+        exporter = EXPORTERS.get(export_format)
+        if exporter is None:
+            raise ValidationError(
+                {"type": f"Supported types: {', '.join(EXPORTERS)}"}
+            )
+        version = get_shopping_list_version(request.user.id)
+        etag = version and quote_etag(f"{version}-{export_format}")
+        if etag and etag in parse_etags(
+            request.headers.get("If-None-Match", "")
+        ):
+            response = HttpResponseNotModified()
+        else:
+            rows = get_cached_shopping_list(request.user, version)
+            response = exporter(rows).get_response()
+        if etag:
+            response["ETag"] = etag
+        patch_cache_control(response, private=True, no_cache=True)
         return response
 
 
-class IngredientViewSet(viewsets.ModelViewSet):
+class IngredientViewSet(ReferenceCacheMixin, viewsets.ModelViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     permission_classes = (IsAdminOrReadOnly,)
-    filter_backends = (filters.SearchFilter,)
-    search_fields = ("^name",)
+    filter_backends = (IngredientSearchFilter,)
     http_method_names = ["get"]
     pagination_class = None
 
-    def get_queryset(self):
-        name = self.request.query_params.get("name")
-        if name:
-            return Ingredient.objects.filter(name__icontains=name.lower())
-        return super().get_queryset()
+    def list(self, request, *args, **kwargs):
+        name = request.query_params.get("name")
+        if name and settings.INGREDIENT_CATALOGUE_ENABLED:
+            return Response(
+                get_catalogue().search(name, INGREDIENT_SEARCH_LIMIT)
+            )
+        return super().list(request, *args, **kwargs)
+
+
+class ConnectionMetricsView(APIView):
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        return Response(get_connection_metrics())
+
+
+class MetricsView(APIView):
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        return HttpResponse(
+            render_metrics(), content_type="text/plain; version=0.0.4"
+        )
+
+
+def _render_read(view, request, *args, **kwargs):
+    close_old_connections()
+    try:
+        response = view(request, *args, **kwargs)
+        if hasattr(response, "render"):
+            response.render()
+        return response
+    finally:
+        close_old_connections()
+
+
+def as_async_read_view(viewset, actions, **initkwargs):
+    """
+    Return an async view serving safe requests from a thread pool.
+
+    Under ASGI Django runs sync views one at a time on a single thread
+    per worker. Reads of this view run on ``ASYNC_READ_THREADS`` threads
+    instead, each with its own database connection, so concurrent reads
+    do not queue behind each other. Writes keep the default path.
+    """
+    view = viewset.as_view(actions, **initkwargs)
+    read = sync_to_async(
+        _render_read, thread_sensitive=False, executor=_read_executor
+    )
+    write = sync_to_async(view)
+
+    async def async_view(request, *args, **kwargs):
+        if request.method in SAFE_METHODS:
+            return await read(view, request, *args, **kwargs)
+        return await write(request, *args, **kwargs)
+
+    async_view.csrf_exempt = True
+    return async_view
@@ -0,0 +1,47 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.http import HttpRequest
+
+from api.views import IngredientViewSet, TagViewSet
+from foodgram.db.base import close_idle_connections
+from recipes.cache import is_cache_shared
+from recipes.catalogue import expire_catalogue, get_catalogue
+
+
+def warm_up_caches():
+    """
+    Build the ingredient catalogue and render the lists into the cache.
+
+    Run in the gunicorn master before forking, so workers inherit the
+    catalogue and find the rendered lists in the shared cache instead
+    of each building them on its first request. A process-local cache
+    is left alone, as ``forget_warm_up()`` clears it in every worker.
+    Connections are closed afterwards, including the ones a connection
+    pool would keep idle, as workers must not share them.
+    """
+    request = HttpRequest()
+    request.method = "GET"
+    try:
+        if settings.INGREDIENT_CATALOGUE_ENABLED:
+            get_catalogue()
+        if is_cache_shared():
+            for viewset in (TagViewSet, IngredientViewSet):
+                viewset.as_view({"get": "list"})(request)
+    finally:
+        connections.close_all()
+        close_idle_connections()
+
+
+def forget_warm_up():
+    """
+    Drop the state a worker inherited from the master as stale.
+
+    Workers forked long after the warm-up, such as recycled ones, would
+    otherwise keep the version tokens and lists of a process-local cache
+    as they were at boot. The catalogue is kept, but its version is
+    re-checked on the first lookup.
+    """
+    if not is_cache_shared():
+        cache.clear()
+    expire_catalogue()
@@ -0,0 +1,213 @@
+import os
+from queue import Empty, LifoQueue
+from threading import BoundedSemaphore, Lock
+from time import monotonic
+
+from django.db.backends.postgresql import base
+from psycopg2 import extensions
+
+from foodgram.db import metrics
+
+_pools = {}
+_pools_lock = Lock()
+_inherited_pools = []
+
+
+class ConnectionPool:
+    """
+    Process-wide pool of at most ``size`` connections to one database.
+
+    Threads block for up to ``timeout`` seconds for a free connection.
+    Idle connections are reused most recently released first, so the
+    ones left over after a burst age out on the server side.
+    A pool belongs to the process that created it: a forked child must
+    not use the parent's sockets, so ``get_pool`` replaces it there.
+    """
+
+    def __init__(self, size, timeout):
+        self.pid = os.getpid()
+        self.size = size
+        self.timeout = timeout
+        self.idle = LifoQueue()
+        self.slots = BoundedSemaphore(size)
+        self.lock = Lock()
+        self.in_use = 0
+
+    def acquire(self, connect, is_usable):
+        if not self.slots.acquire(blocking=False):
+            metrics.increment("pool_waits")
+            start = monotonic()
+            acquired = self.slots.acquire(timeout=self.timeout)
+            metrics.increment("pool_wait_seconds_sum", monotonic() - start)
+            if not acquired:
+                metrics.increment("pool_timeouts")
+                raise base.Database.OperationalError(
+                    f"No free connection in the pool of {self.size} "
+                    f"after {self.timeout} seconds"
+                )
+        with self.lock:
+            self.in_use += 1
+        try:
+            while True:
+                try:
+                    connection = self.idle.get_nowait()
+                except Empty:
+                    metrics.increment("pool_misses")
+                    return connect()
+                if is_usable(connection):
+                    metrics.increment("pool_hits")
+                    return connection
+                metrics.increment("health_check_failures")
+                close_connection(connection)
+        except BaseException:
+            self.free_slot()
+            raise
+
+    def release(self, connection):
+        try:
+            status = connection.get_transaction_status()
+            if status == extensions.TRANSACTION_STATUS_IDLE:
+                self.idle.put(connection)
+            elif status in (
+                extensions.TRANSACTION_STATUS_INTRANS,
+                extensions.TRANSACTION_STATUS_INERROR,
+            ):
+                connection.rollback()
+                self.idle.put(connection)
+            else:
+                close_connection(connection)
+        except base.Database.Error:
+            close_connection(connection)
+        finally:
+            self.free_slot()
+
+    def free_slot(self):
+        with self.lock:
+            self.in_use -= 1
+        self.slots.release()
+
+    def close_idle(self):
+        while True:
+            try:
+                connection = self.idle.get_nowait()
+            except Empty:
+                return
+            close_connection(connection)
+
+    def usage(self):
+        return {
+            "size": self.size,
+            "in_use": self.in_use,
+            "idle": self.idle.qsize(),
+        }
+
+
+_opened_at = {}
+
+
+def close_connection(connection):
+    opened_at = _opened_at.pop(id(connection), None)
+    if opened_at is not None:
+        metrics.record_lifetime(monotonic() - opened_at)
+    connection.close()
+
+
+def get_pool(alias, settings_dict):
+    with _pools_lock:
+        pool = _pools.get(alias)
+        if pool is not None and pool.pid != os.getpid():
+            # Closing the inherited connections would end the parent's
+            # sessions, and so would garbage collecting them.
+            _inherited_pools.append(_pools.pop(alias))
+        if alias not in _pools:
+            _pools[alias] = ConnectionPool(
+                settings_dict["POOL_SIZE"], settings_dict["POOL_TIMEOUT"]
+            )
+            metrics.register_pool(alias, _pools[alias])
+        return _pools[alias]
+
+
+def close_idle_connections():
+    """Close the idle pooled connections of this process."""
+    with _pools_lock:
+        pools = [pool for pool in _pools.values() if pool.pid == os.getpid()]
+    for pool in pools:
+        pool.close_idle()
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    PostgreSQL backend with connection health checks and pooling.
+
+    ``CONN_HEALTH_CHECKS`` pings a persistent connection before it is
+    first used in a request and reconnects when the ping fails, as
+    Django 4.1 does. A positive ``POOL_SIZE`` makes connections come
+    from a process-wide pool shared by the worker's threads; closing a
+    connection returns it to the pool, so ``CONN_MAX_AGE`` should be 0.
+    """
+
+    health_check_done = False
+
+    @property
+    def pool(self):
+        if not self.settings_dict.get("POOL_SIZE"):
+            return None
+        return get_pool(self.alias, self.settings_dict)
+
+    def get_new_connection(self, conn_params):
+        pool = self.pool
+        if pool is not None:
+            return pool.acquire(
+                lambda: self.open_connection(conn_params), self.ping
+            )
+        return self.open_connection(conn_params)
+
+    def open_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        _opened_at[id(connection)] = monotonic()
+        metrics.increment("opened")
+        return connection
+
+    def _close(self):
+        if self.connection is None:
+            return
+        pool = self.pool
+        with self.wrap_database_errors:
+            if pool is not None:
+                pool.release(self.connection)
+            else:
+                close_connection(self.connection)
+
+    def connect(self):
+        super().connect()
+        self.health_check_done = True
+
+    def close_if_unusable_or_obsolete(self):
+        super().close_if_unusable_or_obsolete()
+        self.health_check_done = False
+
+    def close_if_health_check_failed(self):
+        if (
+            self.connection is None
+            or self.health_check_done
+            or not self.settings_dict.get("CONN_HEALTH_CHECKS")
+        ):
+            return
+        if not self.is_usable():
+            metrics.increment("health_check_failures")
+            self.close()
+        self.health_check_done = True
+
+    def _cursor(self, name=None):
+        self.close_if_health_check_failed()
+        return super()._cursor(name)
+
+    def ping(self, connection):
+        if not self.settings_dict.get("CONN_HEALTH_CHECKS"):
+            return not connection.closed
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+        except base.Database.Error:
+            return False
+        return True
@@ -0,0 +1,45 @@
+from threading import Lock
+
+_lock = Lock()
+_counters = {
+    "opened": 0,
+    "closed": 0,
+    "health_check_failures": 0,
+    "lifetime_seconds_sum": 0.0,
+    "lifetime_seconds_max": 0.0,
+    "pool_hits": 0,
+    "pool_misses": 0,
+    "pool_waits": 0,
+    "pool_wait_seconds_sum": 0.0,
+    "pool_timeouts": 0,
+}
+_pools = {}
+
+
+def increment(name, value=1):
+    with _lock:
+        _counters[name] += value
+
+
+def record_lifetime(seconds):
+    with _lock:
+        _counters["closed"] += 1
+        _counters["lifetime_seconds_sum"] += seconds
+        _counters["lifetime_seconds_max"] = max(
+            _counters["lifetime_seconds_max"], seconds
+        )
+
+
+def register_pool(alias, pool):
+    with _lock:
+        _pools[alias] = pool
+
+
+def get_connection_metrics():
+    """Return connection counters of the process and usage of its pools."""
+    with _lock:
+        metrics = dict(_counters)
+        pools = dict(_pools)
+    metrics["open"] = metrics["opened"] - metrics["closed"]
+    metrics["pools"] = {alias: pool.usage() for alias, pool in pools.items()}
+    return metrics
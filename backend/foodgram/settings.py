@@ -27,9 +27,11 @@ INSTALLED_APPS = [
     "djoser",
     "users.apps.UsersConfig",
     "recipes.apps.RecipesConfig",
+    "api.apps.ApiConfig",
 ]
 
 MIDDLEWARE = [
+    "api.middleware.instrumentation_middleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -60,14 +62,24 @@ TEMPLATES = [
 WSGI_APPLICATION = "foodgram.wsgi.application"
 
 
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 0))
+
 DATABASES = {
     "default": {
-        "ENGINE": os.getenv("DB_ENGINE", "django.db.backends.postgresql"),
+        "ENGINE": os.getenv("DB_ENGINE", "foodgram.db"),
         "NAME": os.getenv("DB_NAME", "postgres"),
         "USER": os.getenv("POSTGRES_USER", "postgres"),
         "PASSWORD": os.getenv("POSTGRES_PASSWORD", "31072010"),
         "HOST": os.getenv("DB_HOST", "localhost"),
         "PORT": os.getenv("DB_PORT", "5432"),
+        "CONN_MAX_AGE": (
+            0 if DB_POOL_SIZE else int(os.getenv("DB_CONN_MAX_AGE", 60))
+        ),
+        "CONN_HEALTH_CHECKS": (
+            os.getenv("DB_CONN_HEALTH_CHECKS", "True") == "True"
+        ),
+        "POOL_SIZE": DB_POOL_SIZE,
+        "POOL_TIMEOUT": float(os.getenv("DB_POOL_TIMEOUT", 10)),
     }
 }
 
@@ -109,6 +121,10 @@ REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
         "rest_framework.authentication.TokenAuthentication",
     ],
+    "DEFAULT_RENDERER_CLASSES": [
+        "api.renderers.TimedJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 6,
     "DEFAULT_PERMISSION_CLASSES": [
@@ -117,3 +133,37 @@ REST_FRAMEWORK = {
 }
 
 AUTH_USER_MODEL = "users.User"
+
+if os.getenv("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django_redis.cache.RedisCache",
+            "LOCATION": os.getenv("REDIS_URL"),
+            "OPTIONS": {"IGNORE_EXCEPTIONS": True},
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "OPTIONS": {
+                "MAX_ENTRIES": int(os.getenv("CACHE_MAX_ENTRIES", 10000)),
+            },
+        }
+    }
+RECIPE_CACHE_TIMEOUT = int(os.getenv("RECIPE_CACHE_TIMEOUT", 60))
+
+INGREDIENT_CATALOGUE_ENABLED = (
+    os.getenv("INGREDIENT_CATALOGUE_ENABLED", "False") == "True"
+)
+INGREDIENT_CATALOGUE_TTL = int(os.getenv("INGREDIENT_CATALOGUE_TTL", 60))
+
+IMAGE_RENDITION_WORKERS = int(os.getenv("IMAGE_RENDITION_WORKERS", 2))
+IMAGE_UPLOAD_MAX_SIZE = int(
+    os.getenv("IMAGE_UPLOAD_MAX_SIZE", 10 * 1024 * 1024)
+)
+
+SLOW_REQUEST_THRESHOLD_MS = int(os.getenv("SLOW_REQUEST_THRESHOLD_MS", 500))
+
+ASYNC_READ_VIEWS = os.getenv("SERVER_MODE", "wsgi") == "asgi"
+ASYNC_READ_THREADS = int(os.getenv("ASYNC_READ_THREADS", 8))
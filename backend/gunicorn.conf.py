@@ -0,0 +1,100 @@
+import logging
+import os
+from multiprocessing import cpu_count
+
+SERVER_MODE = os.getenv("SERVER_MODE", "wsgi")
+WORKER_CLASSES = {
+    "sync": "sync",
+    "gthread": "gthread",
+    "uvicorn": "uvicorn.workers.UvicornWorker",
+}
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+logger = logging.getLogger("gunicorn.error")
+
+if SERVER_MODE == "asgi":
+    wsgi_app = "foodgram.asgi:application"
+    worker_type = "uvicorn"
+else:
+    wsgi_app = "foodgram.wsgi:application"
+    worker_type = os.getenv("GUNICORN_WORKER_TYPE", "gthread")
+worker_class = WORKER_CLASSES[worker_type]
+
+# Sync workers serve one request at a time and wait on the database,
+# so they are oversubscribed; threaded and async workers are not.
+if worker_type == "sync":
+    default_workers = cpu_count() * 2 + 1
+else:
+    default_workers = cpu_count() + 1
+workers = int(os.getenv("GUNICORN_WORKERS", default_workers))
+
+threads = int(
+    os.getenv("GUNICORN_THREADS", 4 if worker_type == "gthread" else 1)
+)
+
+bind = os.getenv("GUNICORN_BIND", "0:8000")
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 60))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", 5))
+worker_tmp_dir = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+# Loading the app in the master lets workers share its memory
+# copy-on-write and inherit the warmed up caches.
+preload_app = os.getenv("GUNICORN_PRELOAD", "True") == "True"
+
+# Workers are recycled after a number of requests and, for sync and
+# threaded workers, as soon as their resident memory has grown by
+# more than the limit since they were forked.
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 1000))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", 100))
+max_memory_growth = int(os.getenv("GUNICORN_MAX_MEMORY_GROWTH_MB", 256))
+
+
+def get_resident_memory():
+    """Return the resident memory of the process in megabytes."""
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * PAGE_SIZE / 1024 / 1024
+
+
+def on_starting(server):
+    # Cached responses are invalidated by bumping version tokens in the
+    # cache. A per-process cache only sees the bumps of its worker, so
+    # the others keep serving stale responses.
+    if server.cfg.workers > 1 and not os.getenv("REDIS_URL"):
+        logger.warning(
+            "%s workers without a shared cache serve stale responses: "
+            "set REDIS_URL, or GUNICORN_WORKERS=1",
+            server.cfg.workers,
+        )
+
+
+def when_ready(server):
+    if not preload_app:
+        return
+    from api.warmup import warm_up_caches
+
+    try:
+        warm_up_caches()
+    except Exception:
+        logger.exception("Failed to warm up caches")
+
+
+def post_fork(server, worker):
+    if not preload_app:
+        return
+    from api.warmup import forget_warm_up
+
+    forget_warm_up()
+
+
+def post_worker_init(worker):
+    worker.initial_memory = get_resident_memory()
+
+
+def post_request(worker, req, environ, resp):
+    growth = get_resident_memory() - worker.initial_memory
+    if growth > max_memory_growth:
+        logger.info(
+            "Worker %s grew by %.0f MB, restarting it", worker.pid, growth
+        )
+        worker.alive = False
@@ -1,5 +1,4 @@
 from django.contrib import admin
-from django.db.models import Count
 
 from .models import Favorite, Ingredient, Recipe, ShoppingCart, Tag
 
@@ -39,22 +38,14 @@ class RecipeAdmin(admin.ModelAdmin):
     list_display = (
         "name",
         "author",
-        "total_favorites",
+        "favorites_count",
     )
     search_fields = ("name",)
     list_filter = ("name", "author", "tags")
     empty_value_display = "-empty-"
     ordering = ("pk",)
     inlines = [RecipeIngredientInline]
-
-    def get_queryset(self, request):
-        queryset = super().get_queryset(request)
-        return queryset.annotate(total_favorites=Count("favorites"))
-
-    def total_favorites(self, obj):
-        return obj.total_favorites
-
-    total_favorites.short_description = "Total Favorites"
+    readonly_fields = ("favorites_count", "shopping_cart_count")
 
 
 admin.site.register(Recipe, RecipeAdmin)
@@ -0,0 +1,49 @@
+from uuid import uuid4
+
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+
+TABLE_VERSION_TIMEOUT = None
+LOCAL_CACHE_WARNING = (
+    "The cache is local to this process, so running servers do not see "
+    "the version bumps and keep serving their cached data. Set REDIS_URL "
+    "as for the server, or restart it afterwards."
+)
+
+
+def get_table_version(model):
+    """Return the version token of the model's table."""
+    key = f"table_version:{model._meta.label_lower}"
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid4().hex, TABLE_VERSION_TIMEOUT)
+        version = cache.get(key)
+    return version
+
+
+def get_tables_version(*models):
+    """Return a version token changing whenever any of the tables does."""
+    keys = [f"table_version:{model._meta.label_lower}" for model in models]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, uuid4().hex, TABLE_VERSION_TIMEOUT)
+            versions[key] = cache.get(key)
+    return ":".join(str(versions[key]) for key in keys)
+
+
+def bump_table_version(*models):
+    """Drop the version tokens, so cached data of the tables expires."""
+    cache.delete_many(
+        [f"table_version:{model._meta.label_lower}" for model in models]
+    )
+
+
+def is_cache_shared():
+    """
+    Return whether other processes see the entries of the cache.
+
+    Commands bumping version tokens warn with ``LOCAL_CACHE_WARNING``
+    otherwise, as their bumps would stay in their own process.
+    """
+    return not isinstance(caches["default"], LocMemCache)
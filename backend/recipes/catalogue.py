@@ -0,0 +1,142 @@
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from threading import Lock
+from time import monotonic
+
+from django.conf import settings
+
+from recipes.cache import get_table_version
+from recipes.models import Ingredient
+
+SEPARATOR = "\n"
+
+_catalogue = None
+_checked_at = 0.0
+_lock = Lock()
+
+
+def get_catalogue_version():
+    """
+    Return the version token of the ingredients table.
+
+    Ingredient signals bump it on every save or delete, so renames and
+    unit edits reach the catalogue too.
+    """
+    return get_table_version(Ingredient)
+
+
+class IngredientCatalogue:
+    """
+    Immutable in-memory index of ingredients.
+
+    Lowercased names are kept sorted, so prefix lookups are a binary
+    search. They are also joined into a single string, so substring
+    lookups are a ``str.find`` scan in C instead of a Python loop.
+    """
+
+    def __init__(self, rows, version):
+        rows = sorted(rows, key=lambda row: (row[1].lower(), row[0]))
+        self.version = version
+        self.ids = array("q", (row[0] for row in rows))
+        self.names = tuple(row[1] for row in rows)
+        self.units = tuple(row[2] for row in rows)
+        self.keys = tuple(name.lower() for name in self.names)
+        self.blob = SEPARATOR.join(self.keys)
+        offsets = array("q")
+        offset = 0
+        for key in self.keys:
+            offsets.append(offset)
+            offset += len(key) + len(SEPARATOR)
+        self.offsets = offsets
+
+    @classmethod
+    def build(cls):
+        version = get_catalogue_version()
+        rows = Ingredient.objects.values_list("id", "name", "measurement_unit")
+        return cls(rows, version)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def item(self, index):
+        return {
+            "id": self.ids[index],
+            "name": self.names[index],
+            "measurement_unit": self.units[index],
+        }
+
+    def search(self, query, limit):
+        """Return prefix matches first, then other substring matches."""
+        query = query.lower()
+        if not query or SEPARATOR in query:
+            return []
+        start = bisect_left(self.keys, query)
+        end = start
+        while end < len(self.keys) and self.keys[end].startswith(query):
+            end += 1
+        found = list(range(start, min(end, start + limit)))
+        position = self.blob.find(query)
+        while position != -1 and len(found) < limit:
+            index = bisect_right(self.offsets, position) - 1
+            if not start <= index < end:
+                found.append(index)
+            position = self.blob.find(
+                query, self.offsets[index] + len(self.keys[index]) + 1
+            )
+        return [self.item(index) for index in found]
+
+    def memory_footprint(self):
+        """Return the approximate size of the catalogue in bytes."""
+        size = sum(
+            sys.getsizeof(value)
+            for value in (
+                self.ids,
+                self.names,
+                self.units,
+                self.keys,
+                self.blob,
+                self.offsets,
+            )
+        )
+        size += sum(sys.getsizeof(name) for name in self.names)
+        size += sum(sys.getsizeof(key) for key in self.keys)
+        size += sum(sys.getsizeof(unit) for unit in set(self.units))
+        return size
+
+
+def _is_fresh():
+    return (
+        _catalogue is not None
+        and monotonic() - _checked_at < settings.INGREDIENT_CATALOGUE_TTL
+    )
+
+
+def expire_catalogue():
+    """Make the next lookup re-check the version of the catalogue."""
+    global _checked_at
+    _checked_at = 0.0
+
+
+def get_catalogue():
+    """
+    Return the process-local catalogue, building it lazily.
+
+    The table version is re-read at most once per
+    ``INGREDIENT_CATALOGUE_TTL`` seconds; the catalogue is rebuilt
+    when it changes, or on every check while the cache is unavailable.
+    """
+    global _catalogue, _checked_at
+    if _is_fresh():
+        return _catalogue
+    with _lock:
+        if not _is_fresh():
+            version = get_catalogue_version()
+            if (
+                _catalogue is None
+                or version is None
+                or _catalogue.version != version
+            ):
+                _catalogue = IngredientCatalogue.build()
+            _checked_at = monotonic()
+    return _catalogue
@@ -0,0 +1,100 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image
+
+from recipes.cache import bump_table_version
+from recipes.models import Recipe
+
+logger = logging.getLogger(__name__)
+
+RENDITIONS = {
+    "thumbnail": (160, 160),
+    "card": (480, 480),
+    "full": (1280, 1280),
+}
+FORMATS = {
+    "webp": "WEBP",
+    "jpeg": "JPEG",
+}
+RENDITIONS_DIR = "images/recipes/renditions"
+QUALITY = 82
+
+_executor = ThreadPoolExecutor(
+    max_workers=settings.IMAGE_RENDITION_WORKERS,
+    thread_name_prefix="image-renditions",
+)
+
+
+def rendition_name(name, rendition, extension):
+    stem = os.path.splitext(os.path.basename(name))[0]
+    return f"{RENDITIONS_DIR}/{stem}_{rendition}.{extension}"
+
+
+def rendition_urls(name, ready):
+    """
+    Return URLs of every rendition of the image, by size and format.
+
+    Renditions are made after the recipe is committed; until they are
+    ``ready`` their URLs point at the original image.
+    """
+    original = default_storage.url(name)
+    return {
+        rendition: {
+            extension: (
+                default_storage.url(rendition_name(name, rendition, extension))
+                if ready
+                else original
+            )
+            for extension in FORMATS
+        }
+        for rendition in RENDITIONS
+    }
+
+
+def make_renditions(name, force=False):
+    """
+    Produce resized WebP and JPEG renditions of a stored image.
+
+    Recipes using the image are then marked as having renditions.
+    """
+    with default_storage.open(name) as file:
+        original = Image.open(file)
+        original.load()
+    original = original.convert("RGB")
+    for rendition, size in RENDITIONS.items():
+        image = original.copy()
+        image.thumbnail(size, Image.LANCZOS)
+        for extension, image_format in FORMATS.items():
+            target = rendition_name(name, rendition, extension)
+            if default_storage.exists(target):
+                if not force:
+                    continue
+                default_storage.delete(target)
+            buffer = BytesIO()
+            image.save(buffer, image_format, quality=QUALITY, optimize=True)
+            default_storage.save(target, ContentFile(buffer.getvalue()))
+    if Recipe.objects.filter(image=name, renditions_ready=False).update(
+        renditions_ready=True
+    ):
+        bump_table_version(Recipe)
+
+
+def _make_renditions_logged(name):
+    try:
+        make_renditions(name)
+    except Exception:
+        logger.exception("Failed to make renditions of %s", name)
+
+
+def schedule_renditions(name):
+    """Make renditions in the worker pool once the transaction commits."""
+    transaction.on_commit(
+        lambda: _executor.submit(_make_renditions_logged, name)
+    )
@@ -0,0 +1,93 @@
+from concurrent.futures import ThreadPoolExecutor
+from statistics import median, quantiles
+from time import perf_counter
+
+from django.core.management import BaseCommand, CommandError
+from django.core.signals import request_finished, request_started
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from foodgram.db.base import DatabaseWrapper
+from foodgram.db.metrics import get_connection_metrics
+from recipes.models import Tag
+
+
+class Command(BaseCommand):
+    """
+    Command to compare per-request latency of connection modes.
+
+    Emulates ``--requests`` request cycles on each of ``--threads``
+    threads, sending the request signals Django uses to manage
+    connections around a single query, with new connections per
+    request, persistent connections with and without health checks,
+    and a pool of ``--pool-size`` connections.
+    """
+
+    help = "Benchmark database connection management modes"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=8)
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument("--pool-size", type=int, default=4)
+
+    def handle(self, *args, **options):
+        if not isinstance(connections[DEFAULT_DB_ALIAS], DatabaseWrapper):
+            raise CommandError("Set DB_ENGINE to foodgram.db")
+        modes = {
+            "new connection per request": {
+                "CONN_MAX_AGE": 0,
+                "CONN_HEALTH_CHECKS": False,
+                "POOL_SIZE": 0,
+            },
+            "persistent": {
+                "CONN_MAX_AGE": 600,
+                "CONN_HEALTH_CHECKS": False,
+                "POOL_SIZE": 0,
+            },
+            "persistent, health checks": {
+                "CONN_MAX_AGE": 600,
+                "CONN_HEALTH_CHECKS": True,
+                "POOL_SIZE": 0,
+            },
+            "pool": {
+                "CONN_MAX_AGE": 0,
+                "CONN_HEALTH_CHECKS": True,
+                "POOL_SIZE": options["pool_size"],
+            },
+        }
+        settings_dict = connections.databases[DEFAULT_DB_ALIAS]
+        original = {key: settings_dict.get(key) for key in modes["pool"]}
+        connections.close_all()
+        try:
+            for mode, mode_settings in modes.items():
+                settings_dict.update(mode_settings)
+                opened = get_connection_metrics()["opened"]
+                with ThreadPoolExecutor(options["threads"]) as pool:
+                    timings = [
+                        timing
+                        for thread_timings in pool.map(
+                            self.run_requests,
+                            [options["requests"]] * options["threads"],
+                        )
+                        for timing in thread_timings
+                    ]
+                opened = get_connection_metrics()["opened"] - opened
+                self.stdout.write(
+                    f"{mode}: p50 {median(timings):.2f} ms, "
+                    f"p95 {quantiles(timings, n=20)[18]:.2f} ms, "
+                    f"{opened} connections opened"
+                )
+        finally:
+            settings_dict.update(original)
+
+    def run_requests(self, count):
+        timings = []
+        try:
+            for _ in range(count):
+                start = perf_counter()
+                request_started.send(sender=self.__class__)
+                Tag.objects.count()
+                request_finished.send(sender=self.__class__)
+                timings.append((perf_counter() - start) * 1000)
+        finally:
+            connections.close_all()
+        return timings
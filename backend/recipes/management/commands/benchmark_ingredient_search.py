@@ -0,0 +1,78 @@
+import json
+import os
+from statistics import median
+from time import perf_counter
+
+from django.conf import settings
+from django.core.management import BaseCommand
+from django.db import transaction
+
+from recipes.models import Ingredient
+
+QUERIES = ("м", "сах", "мука", "ого", "соус", "перец чёрный")
+
+
+class Command(BaseCommand):
+    """
+    Command to benchmark ingredient autocomplete lookups.
+
+    Loads data/ingredients.json multiplied by ``--scale`` inside
+    a transaction that is rolled back, so the database is unchanged.
+    """
+
+    help = "Benchmark ingredient search on a scaled-up catalogue"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scale", type=int, default=100)
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--limit", type=int, default=50)
+
+    def handle(self, *args, **options):
+        file_path = os.path.join(
+            settings.BASE_DIR,
+            "data",
+            "ingredients.json",
+        )
+        with open(file_path, "r") as file:
+            data = json.load(file)
+
+        with transaction.atomic():
+            Ingredient.objects.bulk_create(
+                [
+                    Ingredient(
+                        name=f"{item['name']} {copy}"
+                        if copy
+                        else item["name"],
+                        measurement_unit=item["measurement_unit"],
+                    )
+                    for copy in range(options["scale"])
+                    for item in data
+                ],
+                batch_size=5000,
+            )
+            self.stdout.write(
+                f"{Ingredient.objects.count()} ingredients loaded"
+            )
+            for query in QUERIES:
+                self.stdout.write(
+                    f"{query!r}: "
+                    f"legacy {self.measure(options, self.legacy, query)}, "
+                    f"search {self.measure(options, self.search, query)}"
+                )
+            transaction.set_rollback(True)
+
+    @staticmethod
+    def legacy(query, limit):
+        return list(Ingredient.objects.filter(name__icontains=query.lower()))
+
+    @staticmethod
+    def search(query, limit):
+        return list(Ingredient.objects.search(query)[:limit])
+
+    def measure(self, options, lookup, query):
+        timings = []
+        for _ in range(options["repeat"]):
+            start = perf_counter()
+            rows = lookup(query, options["limit"])
+            timings.append(perf_counter() - start)
+        return f"{len(rows)} rows in {median(timings) * 1000:.2f} ms"
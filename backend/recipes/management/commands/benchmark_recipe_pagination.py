@@ -0,0 +1,112 @@
+from statistics import median
+from time import perf_counter
+from urllib.parse import parse_qs, urlparse
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.management import BaseCommand
+from django.db import transaction
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.services import RecipePaginator, get_recipe_queryset
+from recipes.models import Recipe
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    """
+    Command to compare page number and keyset pagination of recipes.
+
+    Creates ``--recipes`` recipes inside a transaction that is rolled
+    back, then times ``RecipePaginator`` fetching a page at increasing
+    depths in both modes. Keyset pages are reached by following the
+    ``next`` links, as clients do.
+    """
+
+    help = "Benchmark deep-page latency of recipe pagination modes"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--recipes", type=int, default=100000)
+        parser.add_argument("--page-size", type=int, default=6)
+        parser.add_argument("--repeat", type=int, default=10)
+
+    def handle(self, *args, **options):
+        page_size = options["page_size"]
+        with transaction.atomic():
+            author = User.objects.create(
+                email="benchmark@foodgram.local",
+                username="benchmark",
+                first_name="benchmark",
+                last_name="benchmark",
+            )
+            Recipe.objects.bulk_create(
+                [
+                    Recipe(
+                        author=author,
+                        name=f"recipe {number}",
+                        image="images/recipes/borsch.jpg",
+                        text="benchmark",
+                        cooking_time=10,
+                    )
+                    for number in range(options["recipes"])
+                ],
+                batch_size=5000,
+            )
+            queryset = get_recipe_queryset(AnonymousUser()).order_by(
+                "-pub_date", "-id"
+            )
+            total = queryset.count()
+            factory = APIRequestFactory()
+            params = {"limit": page_size}
+            cursor_params = {**params, "pagination": "cursor"}
+            depth = 1
+            page = 1
+            while depth * page_size < total:
+                while page < depth:
+                    cursor_params = self.next_params(
+                        queryset, factory, cursor_params
+                    )
+                    page += 1
+                offset_time = self.measure(
+                    options,
+                    lambda: self.fetch(
+                        queryset, factory, {**params, "page": depth}
+                    ),
+                )
+                keyset_time = self.measure(
+                    options,
+                    lambda: self.fetch(queryset, factory, cursor_params),
+                )
+                self.stdout.write(
+                    f"page {depth}: page number {offset_time:.2f} ms, "
+                    f"keyset {keyset_time:.2f} ms"
+                )
+                depth *= 10
+            transaction.set_rollback(True)
+
+    @staticmethod
+    def fetch(queryset, factory, params):
+        """Return the paginator and the page it fetched for the params."""
+        request = Request(factory.get("/api/recipes/", params))
+        paginator = RecipePaginator()
+        return paginator, paginator.paginate_queryset(queryset, request)
+
+    def next_params(self, queryset, factory, params):
+        """Return the params of the keyset page after the given one."""
+        paginator, _ = self.fetch(queryset, factory, params)
+        cursor = paginator.cursor_paginator.get_next_link()
+        return {
+            **params,
+            "cursor": parse_qs(urlparse(cursor).query)["cursor"][0],
+        }
+
+    @staticmethod
+    def measure(options, fetch):
+        timings = []
+        for _ in range(options["repeat"]):
+            start = perf_counter()
+            fetch()
+            timings.append(perf_counter() - start)
+        return median(timings) * 1000
@@ -0,0 +1,132 @@
+import os
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from statistics import median, quantiles
+from time import perf_counter
+from urllib.error import URLError
+from urllib.request import urlopen
+
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+
+from recipes.models import Ingredient, Recipe, Tag
+
+MODES = {
+    "wsgi": ("foodgram.wsgi:application", "sync"),
+    "asgi": ("foodgram.asgi:application", "uvicorn.workers.UvicornWorker"),
+}
+
+
+class Command(BaseCommand):
+    """
+    Command to load test the WSGI and ASGI deployments side by side.
+
+    Starts gunicorn in each mode with the same number of workers
+    against the configured database, fires ``--requests`` reads at the
+    hot read endpoints from ``--concurrency`` clients and prints the
+    throughput and latency percentiles of both.
+    """
+
+    help = "Compare read throughput of WSGI and ASGI serving modes"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=2)
+        parser.add_argument("--concurrency", type=int, default=32)
+        parser.add_argument("--requests", type=int, default=2000)
+        parser.add_argument("--port", type=int, default=8765)
+
+    def handle(self, *args, **options):
+        recipe = Recipe.objects.order_by("id").first()
+        tag = Tag.objects.order_by("id").first()
+        ingredient = Ingredient.objects.order_by("id").first()
+        if not (recipe and tag and ingredient):
+            raise CommandError("Load recipes, tags and ingredients first")
+        paths = [
+            "/api/recipes/",
+            f"/api/recipes/?tags={tag.slug}",
+            f"/api/recipes/{recipe.id}/",
+            "/api/tags/",
+            "/api/ingredients/",
+            f"/api/ingredients/{ingredient.id}/",
+        ]
+        for mode, (application, worker_class) in MODES.items():
+            server = self.start_server(
+                options, mode, application, worker_class
+            )
+            try:
+                self.run_load(options, mode, paths)
+            finally:
+                server.terminate()
+                server.wait()
+
+    def start_server(self, options, mode, application, worker_class):
+        server = subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "gunicorn",
+                # Only the options below, not the deployment's
+                # gunicorn.conf.py picked up from BASE_DIR.
+                "--config",
+                os.devnull,
+                application,
+                "--workers",
+                str(options["workers"]),
+                "--worker-class",
+                worker_class,
+                "--bind",
+                f"127.0.0.1:{options['port']}",
+                "--log-level",
+                "warning",
+            ],
+            cwd=settings.BASE_DIR,
+            env={**os.environ, "SERVER_MODE": mode},
+        )
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            try:
+                socket.create_connection(
+                    ("127.0.0.1", options["port"])
+                ).close()
+            except OSError:
+                time.sleep(0.2)
+                continue
+            return server
+        server.terminate()
+        raise CommandError(f"{mode} server did not start")
+
+    def run_load(self, options, mode, paths):
+        base = f"http://127.0.0.1:{options['port']}"
+        for path in paths:
+            self.fetch(base + path)
+
+        def fetch(number):
+            return self.fetch(base + paths[number % len(paths)])
+
+        start = perf_counter()
+        with ThreadPoolExecutor(max_workers=options["concurrency"]) as pool:
+            timings = list(pool.map(fetch, range(options["requests"])))
+        elapsed = perf_counter() - start
+        errors = timings.count(None)
+        timings = [timing for timing in timings if timing is not None]
+        percentiles = quantiles(timings, n=100)
+        self.stdout.write(
+            f"{mode}: {len(timings) / elapsed:.0f} req/s, "
+            f"p50 {median(timings):.1f} ms, "
+            f"p95 {percentiles[94]:.1f} ms, "
+            f"p99 {percentiles[98]:.1f} ms, "
+            f"{errors} errors"
+        )
+
+    @staticmethod
+    def fetch(url):
+        start = perf_counter()
+        try:
+            with urlopen(url, timeout=30) as response:
+                response.read()
+        except (URLError, OSError):
+            return None
+        return (perf_counter() - start) * 1000
@@ -0,0 +1,108 @@
+import random
+from statistics import median
+from time import perf_counter
+
+from django.contrib.auth import get_user_model
+from django.core.management import BaseCommand
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+
+from recipes.models import Recipe, Tag
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    """
+    Command to compare tag filtering through a join and through EXISTS.
+
+    Creates ``--recipes`` recipes with random tags out of ``--tags``
+    inside a transaction that is rolled back, then prints the plans
+    and the latency of counting and fetching the first page.
+    """
+
+    help = "Benchmark recipe filtering by tags"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--recipes", type=int, default=50000)
+        parser.add_argument("--tags", type=int, default=30)
+        parser.add_argument("--tags-per-recipe", type=int, default=3)
+        parser.add_argument("--filter-tags", type=int, default=3)
+        parser.add_argument("--repeat", type=int, default=10)
+
+    def handle(self, *args, **options):
+        randomizer = random.Random(0)
+        with transaction.atomic():
+            author = User.objects.create(
+                email="benchmark@foodgram.local",
+                username="benchmark",
+                first_name="benchmark",
+                last_name="benchmark",
+            )
+            Tag.objects.bulk_create(
+                [
+                    Tag(
+                        name=f"benchmark {number}",
+                        color=f"#b{number:05x}",
+                        slug=f"benchmark-{number}",
+                    )
+                    for number in range(options["tags"])
+                ]
+            )
+            tags = list(Tag.objects.filter(slug__startswith="benchmark-"))
+            Recipe.objects.bulk_create(
+                [
+                    Recipe(
+                        author=author,
+                        name=f"recipe {number}",
+                        image="images/recipes/borsch.jpg",
+                        text="benchmark " * 100,
+                        cooking_time=10,
+                    )
+                    for number in range(options["recipes"])
+                ],
+                batch_size=5000,
+            )
+            Recipe.tags.through.objects.bulk_create(
+                [
+                    Recipe.tags.through(recipe_id=recipe_id, tag_id=tag.id)
+                    for recipe_id in Recipe.objects.filter(
+                        author=author
+                    ).values_list("id", flat=True)
+                    for tag in randomizer.sample(
+                        tags, options["tags_per_recipe"]
+                    )
+                ],
+                batch_size=5000,
+            )
+            slugs = [tag.slug for tag in tags[: options["filter_tags"]]]
+            queryset = Recipe.objects.filter(author__is_active=True)
+            variants = {
+                "join + distinct": queryset.filter(
+                    tags__slug__in=slugs
+                ).distinct(),
+                "exists": queryset.filter(
+                    Exists(
+                        Recipe.tags.through.objects.filter(
+                            recipe=OuterRef("pk"), tag__slug__in=slugs
+                        )
+                    )
+                ),
+            }
+            for name, variant in variants.items():
+                self.stdout.write(f"{name}:\n{variant.explain()}")
+                self.stdout.write(
+                    f"{variant.count()} recipes, "
+                    f"{self.measure(options, variant):.2f} ms\n"
+                )
+            transaction.set_rollback(True)
+
+    @staticmethod
+    def measure(options, queryset):
+        timings = []
+        for _ in range(options["repeat"]):
+            start = perf_counter()
+            queryset.count()
+            list(queryset[:6])
+            timings.append(perf_counter() - start)
+        return median(timings) * 1000
@@ -0,0 +1,59 @@
+import os
+from datetime import timedelta
+
+from django.core.management import BaseCommand
+from django.utils import timezone
+
+from recipes.images import RENDITIONS_DIR
+from recipes.models import Recipe
+from recipes.storage import is_hashed_name
+
+
+class Command(BaseCommand):
+    """
+    Command to delete recipe images no recipe refers to any more.
+
+    Only content-addressed files and their renditions are considered.
+    Files younger than ``--grace`` minutes are kept, so uploads whose
+    recipe has not been committed yet survive. So are the renditions
+    of such an image: a repeated upload only touches the original.
+    """
+
+    help = "Delete unreferenced recipe images and their renditions"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--grace", type=int, default=60)
+        parser.add_argument("--dry-run", action="store_true")
+
+    def handle(self, *args, **options):
+        field = Recipe._meta.get_field("image")
+        storage = field.storage
+        referenced = {
+            self.stem(name)
+            for name in Recipe.objects.values_list("image", flat=True)
+        }
+        cutoff = timezone.now() - timedelta(minutes=options["grace"])
+        deleted = freed = 0
+        recent = set()
+        # Originals come first, so their renditions share their grace.
+        for directory in (field.upload_to, RENDITIONS_DIR):
+            if not storage.exists(directory):
+                continue
+            for filename in storage.listdir(directory)[1]:
+                name = os.path.join(directory, filename)
+                stem = self.stem(name)
+                if not is_hashed_name(stem) or stem in referenced:
+                    continue
+                if stem in recent or storage.get_modified_time(name) > cutoff:
+                    recent.add(stem)
+                    continue
+                deleted += 1
+                freed += storage.size(name)
+                if not options["dry_run"]:
+                    storage.delete(name)
+        action = "Would delete" if options["dry_run"] else "Deleted"
+        self.stdout.write(f"{action} {deleted} files, {freed} bytes")
+
+    @staticmethod
+    def stem(name):
+        return os.path.splitext(os.path.basename(name))[0].split("_")[0]
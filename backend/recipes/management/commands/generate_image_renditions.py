@@ -0,0 +1,45 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management import BaseCommand
+
+from recipes.cache import LOCAL_CACHE_WARNING, is_cache_shared
+from recipes.images import make_renditions
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    """
+    Command to backfill resized renditions of recipe images.
+
+    Existing renditions are kept unless ``--force`` is given. Recipes
+    are marked as having renditions, so the API starts linking them;
+    run it once after migrating existing images.
+    """
+
+    help = "Generate resized renditions of existing recipe images"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--force", action="store_true")
+        parser.add_argument(
+            "--workers", type=int, default=settings.IMAGE_RENDITION_WORKERS
+        )
+
+    def handle(self, *args, **options):
+        if not is_cache_shared():
+            self.stderr.write(self.style.WARNING(LOCAL_CACHE_WARNING))
+        names = (
+            Recipe.objects.exclude(image="")
+            .order_by()
+            .values_list("image", flat=True)
+            .distinct()
+        )
+        with ThreadPoolExecutor(max_workers=options["workers"]) as executor:
+            futures = {
+                name: executor.submit(make_renditions, name, options["force"])
+                for name in names
+            }
+        for name, future in futures.items():
+            if future.exception() is not None:
+                self.stderr.write(f"{name}: {future.exception()}")
+        self.stdout.write(f"Processed {len(futures)} images")
@@ -4,6 +4,8 @@ import os
 from django.conf import settings
 from django.core.management import BaseCommand
 
+from recipes.cache import (LOCAL_CACHE_WARNING, bump_table_version,
+                           is_cache_shared)
 from recipes.models import Ingredient
 
 MODEL_AND_FILE_TABLE = {
@@ -22,6 +24,8 @@ class Command(BaseCommand):
     help = "Import JSON data to DB"
 
     def handle(self, *args, **options):
+        if not is_cache_shared():
+            self.stderr.write(self.style.WARNING(LOCAL_CACHE_WARNING))
         for (
             model,
             file_name,
@@ -42,4 +46,5 @@ class Command(BaseCommand):
                 [model(**item) for item in data],
                 ignore_conflicts=True,
             )
+            bump_table_version(model)
             print(f"Data imported to {model._meta.verbose_name_plural}")
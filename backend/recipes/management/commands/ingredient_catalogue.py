@@ -0,0 +1,39 @@
+from time import perf_counter
+
+from django.core.management import BaseCommand
+
+from recipes.catalogue import IngredientCatalogue
+
+
+class Command(BaseCommand):
+    """
+    Command to build the in-memory ingredient catalogue.
+
+    Reports the build time, the memory footprint and the lookup
+    latency of the catalogue used by the ingredient autocomplete.
+    """
+
+    help = "Build the ingredient catalogue and report its footprint"
+
+    def add_arguments(self, parser):
+        parser.add_argument("queries", nargs="*", default=["са", "мука"])
+
+    def handle(self, *args, **options):
+        start = perf_counter()
+        catalogue = IngredientCatalogue.build()
+        build_time = perf_counter() - start
+        self.stdout.write(
+            f"{len(catalogue)} ingredients, version {catalogue.version}"
+        )
+        self.stdout.write(f"Build time: {build_time * 1000:.2f} ms")
+        self.stdout.write(
+            f"Memory footprint: {catalogue.memory_footprint() / 1024:.1f} KiB"
+        )
+        for query in options["queries"]:
+            start = perf_counter()
+            found = catalogue.search(query, 50)
+            lookup_time = perf_counter() - start
+            self.stdout.write(
+                f"{query!r}: {len(found)} rows "
+                f"in {lookup_time * 1000000:.1f} µs"
+            )
@@ -0,0 +1,51 @@
+from django.contrib.auth import get_user_model
+from django.core.management import BaseCommand
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from recipes.cache import (LOCAL_CACHE_WARNING, bump_table_version,
+                           is_cache_shared)
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import Subscription
+
+User = get_user_model()
+
+
+def count_of(queryset, field):
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef("pk")})
+            .order_by()
+            .values(field)
+            .annotate(count=Count("pk"))
+            .values("count")
+        ),
+        0,
+    )
+
+
+class Command(BaseCommand):
+    """
+    Command to repair denormalized counters.
+
+    Recomputes favorites and shopping cart counts of recipes,
+    recipe and follower counts of users.
+    """
+
+    help = "Recompute denormalized recipe and user counters"
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        if not is_cache_shared():
+            self.stderr.write(self.style.WARNING(LOCAL_CACHE_WARNING))
+        recipes = Recipe.objects.update(
+            favorites_count=count_of(Favorite.objects.all(), "recipe"),
+            shopping_cart_count=count_of(ShoppingCart.objects.all(), "recipe"),
+        )
+        users = User.objects.update(
+            recipes_count=count_of(Recipe.objects.all(), "author"),
+            followers_count=count_of(Subscription.objects.all(), "author"),
+        )
+        transaction.on_commit(lambda: bump_table_version(Recipe, User))
+        self.stdout.write(f"Recounted {recipes} recipes and {users} users")
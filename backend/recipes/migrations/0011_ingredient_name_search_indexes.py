@@ -0,0 +1,34 @@
+from django.db import migrations
+
+
+def create_search_indexes(apps, schema_editor):
+    # Other backends get no index: none serves the LIKE '%x%' lookups
+    # of the search, nor the case folding of Cyrillic names.
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS recipes_ingredient_name_trgm "
+            "ON recipes_ingredient USING gin (UPPER(name) gin_trgm_ops)"
+        )
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS recipes_ingredient_name_prefix "
+            "ON recipes_ingredient (UPPER(name) text_pattern_ops)"
+        )
+
+
+def drop_search_indexes(apps, schema_editor):
+    for index in (
+        "recipes_ingredient_name_trgm",
+        "recipes_ingredient_name_prefix",
+    ):
+        schema_editor.execute(f"DROP INDEX IF EXISTS {index}")
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("recipes", "0010_auto_20230618_0524"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -0,0 +1,15 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("recipes", "0011_ingredient_name_search_indexes"),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            "CREATE INDEX recipes_recipe_tags_tag_recipe_idx "
+            "ON recipes_recipe_tags (tag_id, recipe_id)",
+            "DROP INDEX recipes_recipe_tags_tag_recipe_idx",
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 3.2.9 on 2026-10-18 18:43
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_of(queryset, field):
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef("pk")})
+            .order_by()
+            .values(field)
+            .annotate(count=Count("pk"))
+            .values("count")
+        ),
+        0,
+    )
+
+
+def populate_counters(apps, schema_editor):
+    Recipe = apps.get_model("recipes", "Recipe")
+    Favorite = apps.get_model("recipes", "Favorite")
+    ShoppingCart = apps.get_model("recipes", "ShoppingCart")
+    User = apps.get_model("users", "User")
+    Subscription = apps.get_model("users", "Subscription")
+    Recipe.objects.update(
+        favorites_count=count_of(Favorite.objects.all(), "recipe"),
+        shopping_cart_count=count_of(ShoppingCart.objects.all(), "recipe"),
+    )
+    User.objects.update(
+        recipes_count=count_of(Recipe.objects.all(), "author"),
+        followers_count=count_of(Subscription.objects.all(), "author"),
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("recipes", "0012_recipe_tags_tag_recipe_index"),
+        ("users", "0004_user_counters"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="favorites_count",
+            field=models.PositiveIntegerField(
+                default=0, verbose_name="в избранном"
+            ),
+        ),
+        migrations.AddField(
+            model_name="recipe",
+            name="shopping_cart_count",
+            field=models.PositiveIntegerField(
+                default=0, verbose_name="в списках покупок"
+            ),
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 3.2.9 on 2026-10-18 18:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("recipes", "0013_recipe_counters"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="popularity_score",
+            field=models.FloatField(
+                default=0,
+                help_text="precomputed by the update_popularity command",
+                verbose_name="популярность",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="recipe",
+            index=models.Index(
+                fields=["-popularity_score", "-pub_date"],
+                name="recipe_popularity_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 3.2.9 on 2026-10-18 18:50
+
+from django.db import migrations, models
+
+import recipes.storage
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("recipes", "0014_recipe_popularity_score"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="recipe",
+            name="image",
+            field=models.ImageField(
+                storage=recipes.storage.ContentAddressedStorage(),
+                upload_to="images/recipes/",
+                verbose_name="изображение",
+            ),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 3.2.9 on 2026-10-18 19:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("recipes", "0015_recipe_image_content_addressed_storage"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="renditions_ready",
+            field=models.BooleanField(
+                default=False,
+                help_text="set once the image renditions are stored",
+                verbose_name="миниатюры готовы",
+            ),
+        ),
+    ]
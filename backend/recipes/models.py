@@ -1,11 +1,35 @@
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.db.models import Case, IntegerField, Value, When
 
+from recipes.storage import ContentAddressedStorage
 from recipes.validators import validate_ingredient_amount
 
 User = get_user_model()
 
 
+class IngredientQuerySet(models.QuerySet):
+    def search(self, name):
+        """
+        Find ingredients whose name contains ``name``.
+
+        Prefix matches come first, then the other substring matches,
+        both ordered by name. On PostgreSQL the lookups are served
+        by the trigram and prefix indexes on ``UPPER(name)``.
+        """
+        return (
+            self.filter(name__icontains=name)
+            .annotate(
+                match_rank=Case(
+                    When(name__istartswith=name, then=Value(0)),
+                    default=Value(1),
+                    output_field=IntegerField(),
+                )
+            )
+            .order_by("match_rank", "name")
+        )
+
+
 class Ingredient(models.Model):
     name = models.CharField(
         max_length=200, verbose_name="название ингредиента"
@@ -14,6 +38,8 @@ class Ingredient(models.Model):
         max_length=200, verbose_name="единица измерения"
     )
 
+    objects = IngredientQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.name} ({self.measurement_unit})"
 
@@ -52,7 +78,9 @@ class Recipe(models.Model):
     )
     name = models.CharField(max_length=200, verbose_name="название рецепта")
     image = models.ImageField(
-        upload_to="images/recipes/", verbose_name="изображение"
+        upload_to="images/recipes/",
+        storage=ContentAddressedStorage(),
+        verbose_name="изображение",
     )
     text = models.TextField(verbose_name="описание рецепта")
     ingredients = models.ManyToManyField(
@@ -70,14 +98,56 @@ class Recipe(models.Model):
     pub_date = models.DateTimeField(
         auto_now_add=True, db_index=True, verbose_name="дата публикации"
     )
+    favorites_count = models.PositiveIntegerField(
+        default=0, verbose_name="в избранном"
+    )
+    shopping_cart_count = models.PositiveIntegerField(
+        default=0, verbose_name="в списках покупок"
+    )
+    popularity_score = models.FloatField(
+        default=0,
+        help_text="precomputed by the update_popularity command",
+        verbose_name="популярность",
+    )
+    renditions_ready = models.BooleanField(
+        default=False,
+        help_text="set once the image renditions are stored",
+        verbose_name="миниатюры готовы",
+    )
+
+    COUNTER_FIELDS = (
+        "favorites_count",
+        "shopping_cart_count",
+        "popularity_score",
+    )
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        # The counters are only changed by atomic F() updates, and the
+        # renditions flag by the image workers. Writing back the values
+        # loaded with the instance would undo the updates committed since.
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.COUNTER_FIELDS
+                and field.name != "renditions_ready"
+            ]
+        super().save(*args, **kwargs)
+
     class Meta:
         ordering = ["-pub_date"]
         verbose_name = "рецепт"
         verbose_name_plural = "рецепты"
+        indexes = [
+            models.Index(
+                fields=["-popularity_score", "-pub_date"],
+                name="recipe_popularity_idx",
+            )
+        ]
 
 
 class RecipeIngredient(models.Model):
@@ -0,0 +1,28 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from recipes.cache import bump_table_version
+from recipes.models import Ingredient, Recipe, Tag
+
+User = get_user_model()
+
+
+@receiver([post_save, post_delete], sender=Ingredient)
+@receiver([post_save, post_delete], sender=Tag)
+def invalidate_reference_cache(sender, **kwargs):
+    transaction.on_commit(lambda: bump_table_version(sender))
+
+
+@receiver([post_save, post_delete], sender=Recipe)
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def invalidate_recipe_cache(sender, **kwargs):
+    transaction.on_commit(lambda: bump_table_version(Recipe))
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_user_cache(sender, update_fields=None, **kwargs):
+    if update_fields is not None and set(update_fields) == {"last_login"}:
+        return
+    transaction.on_commit(lambda: bump_table_version(User))
@@ -0,0 +1,52 @@
+import hashlib
+import os
+import re
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+HASHED_NAME = re.compile(r"^[0-9a-f]{64}(\.\w+)?$")
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    File system storage naming files by the SHA-256 of their content.
+
+    Saving content that is already stored returns the existing name
+    instead of writing a copy, so identical uploads share one file,
+    and touches it.
+    Stored files never change, which makes them safe to cache forever.
+    Files are not removed when they lose their last reference; see the
+    ``collect_image_garbage`` command.
+    """
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+        name = self.get_hashed_name(name, content)
+        try:
+            # A fresh mtime keeps collect_image_garbage from removing
+            # the file before the new reference is committed.
+            os.utime(self.path(name))
+        except FileNotFoundError:
+            return super().save(name, content, max_length)
+        return name
+
+    @staticmethod
+    def get_hashed_name(name, content):
+        digest = hashlib.sha256()
+        content.seek(0)
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        directory = os.path.dirname(name)
+        extension = os.path.splitext(name)[1].lower()
+        return os.path.join(directory, digest.hexdigest() + extension)
+
+
+def is_hashed_name(name):
+    return bool(HASHED_NAME.match(os.path.basename(name)))
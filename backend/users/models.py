@@ -17,6 +17,12 @@ class User(AbstractUser):
     first_name = models.CharField(max_length=150, verbose_name="имя")
     last_name = models.CharField(max_length=150, verbose_name="фамилия")
     password = models.CharField(max_length=150, verbose_name="пароль")
+    recipes_count = models.PositiveIntegerField(
+        default=0, verbose_name="количество рецептов"
+    )
+    followers_count = models.PositiveIntegerField(
+        default=0, verbose_name="количество подписчиков"
+    )
 
     REQUIRED_FIELDS = [
         "first_name",
@@ -24,6 +30,7 @@ class User(AbstractUser):
         "username",
     ]
     USERNAME_FIELD = "email"
+    COUNTER_FIELDS = ("recipes_count", "followers_count")
 
     class Meta:
         verbose_name = "пользователь"
@@ -33,6 +40,17 @@ class User(AbstractUser):
     def __str__(self):
         return self.email
 
+    def save(self, *args, **kwargs):
+        # Leave the counters to change_counter(), as Recipe.save() does.
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
 
 class Subscription(models.Model):
     author = models.ForeignKey(